@@ -1,4 +1,4 @@
-from django.contrib import admin
+from django.contrib import admin, messages
 
 from .models import Lesson
 
@@ -31,26 +31,29 @@ class LessonAdmin(admin.ModelAdmin):
     actions = ["mark_as_completed", "mark_as_cancelled"]
 
     def mark_as_completed(self, request, queryset):
-        """Завершение уроков."""
-        count = 0
-        for lesson in queryset:
-            if lesson.complete_lesson():
-                count += 1
-
-        self.message_user(request, f"Успешно завершено {count} уроков.")
+        """Завершение уроков одним UPDATE."""
+        self._bulk_transition(request, queryset, "complete", "завершено")
 
     mark_as_completed.short_description = "Завершить выбранные уроки"
 
     def mark_as_cancelled(self, request, queryset):
-        """Отмена уроков."""
-        count = 0
-        for lesson in queryset:
-            if lesson.cancel_lesson():
-                count += 1
-
-        self.message_user(request, f"Успешно отменено {count} уроков.")
+        """Отмена уроков одним UPDATE."""
+        self._bulk_transition(request, queryset, "cancel", "отменено")
 
     mark_as_cancelled.short_description = "Отменить выбранные уроки"
 
+    def _bulk_transition(self, request, queryset, action, verb):
+        results = queryset.bulk_transition(action)
+        applied = sum(1 for result in results if result.applied)
+        self.message_user(request, f"Успешно {verb} {applied} уроков.")
+
+        skipped = [str(result.id) for result in results if not result.applied]
+        if skipped:
+            self.message_user(
+                request,
+                f"Не изменены из-за текущего статуса: {', '.join(skipped)}",
+                level=messages.WARNING,
+            )
+
     def get_queryset(self, request):
         return super().get_queryset(request).select_related("teacher", "student")
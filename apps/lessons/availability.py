@@ -0,0 +1,152 @@
+"""
+Занятость преподавателей и студентов (GET /users/{id}/availability/).
+
+Занятые интервалы всех запрошенных пользователей читаются одним запросом.
+Условие на пересечение с окном совпадает с exclusion-ограничениями модели,
+поэтому запрос идет по их GiST-индексам. Интервалы каждого пользователя
+сливаются за один проход, свободные слоты считаются по сетке от начала окна.
+
+Результат кешируется по пользователю и окну. Запись хранит версию
+пользователя; версия меняется после коммита изменения любого его урока
+(см. signals.py), как и в кеше уроков (cache.py).
+"""
+
+import uuid
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+
+from .models import Lesson, LessonStatus, TsTzRange, User
+
+# Меняется вместе с форматом записи кеша.
+SCHEMA_VERSION = 1
+
+
+def get_timeouts():
+    payload_timeout = getattr(settings, "AVAILABILITY_CACHE_TIMEOUT", 10 * 60)
+    return payload_timeout, payload_timeout * 24
+
+
+def _version_key(user_id):
+    return f"availability:{SCHEMA_VERSION}:{user_id}:version"
+
+
+def _data_key(user_id, start, end, slot):
+    window = f"{start.timestamp():.0f}:{end.timestamp():.0f}:{slot.total_seconds():.0f}"
+    return f"availability:{SCHEMA_VERSION}:{user_id}:{window}"
+
+
+def get_availability(user_ids, start, end, slot):
+    """
+    Занятость пользователей в окне [start, end).
+
+    Возвращает {user_id: {"busy": [(начало, конец)], "free": [(начало, конец)]}}
+    только для существующих пользователей. Промахи кеша считаются вместе,
+    одним запросом к урокам.
+    """
+    version_keys = {user_id: _version_key(user_id) for user_id in user_ids}
+    data_keys = {user_id: _data_key(user_id, start, end, slot) for user_id in user_ids}
+    cached = cache.get_many([*version_keys.values(), *data_keys.values()])
+
+    result, missing = {}, []
+    for user_id in user_ids:
+        version = cached.get(version_keys[user_id])
+        entry = cached.get(data_keys[user_id])
+        if entry is not None and entry["version"] == version:
+            result[user_id] = entry["data"]
+        else:
+            missing.append(user_id)
+
+    if missing:
+        computed = compute_availability(missing, start, end, slot)
+        payload_timeout, _ = get_timeouts()
+        # Версия прочитана до запроса к БД: если урок изменится раньше,
+        # чем запись попадет в кеш, она уже не совпадет с новой версией.
+        cache.set_many(
+            {
+                data_keys[user_id]: {
+                    "version": cached.get(version_keys[user_id]),
+                    "data": data,
+                }
+                for user_id, data in computed.items()
+            },
+            payload_timeout,
+        )
+        result.update(computed)
+
+    return {user_id: result[user_id] for user_id in user_ids if user_id in result}
+
+
+def compute_availability(user_ids, start, end, slot):
+    users = set(User.objects.filter(pk__in=user_ids).values_list("pk", flat=True))
+    if not users:
+        return {}
+
+    lessons = (
+        Lesson.objects.exclude(status=LessonStatus.CANCELLED)
+        .filter(Q(teacher_id__in=users) | Q(student_id__in=users))
+        .annotate(span=TsTzRange("start_time", "end_time"))
+        .filter(span__overlap=(start, end))
+        .order_by("start_time")
+        .values_list("teacher_id", "student_id", "start_time", "end_time")
+    )
+
+    # Уроки идут по времени начала, поэтому слияние - один проход.
+    busy = defaultdict(list)
+    for teacher_id, student_id, lesson_start, lesson_end in lessons:
+        lesson_start, lesson_end = max(lesson_start, start), min(lesson_end, end)
+        for user_id in {teacher_id, student_id} & users:
+            intervals = busy[user_id]
+            if intervals and lesson_start <= intervals[-1][1]:
+                if lesson_end > intervals[-1][1]:
+                    intervals[-1] = (intervals[-1][0], lesson_end)
+            else:
+                intervals.append((lesson_start, lesson_end))
+
+    return {
+        user_id: {
+            "busy": busy[user_id],
+            "free": free_slots(busy[user_id], start, end, slot),
+        }
+        for user_id in users
+    }
+
+
+def free_slots(busy, start, end, slot):
+    """Слоты длиной slot по сетке от start, не пересекающие занятые интервалы."""
+    slots = []
+    i = 0
+    slot_start = start
+    while slot_start + slot <= end:
+        slot_end = slot_start + slot
+        while i < len(busy) and busy[i][1] <= slot_start:
+            i += 1
+        if i == len(busy) or busy[i][0] >= slot_end:
+            slots.append((slot_start, slot_end))
+        slot_start = slot_end
+    return slots
+
+
+def lesson_users(lesson):
+    """Пользователи, чью занятость меняет изменение урока (включая прежних)."""
+    users = {
+        lesson.teacher_id,
+        lesson.student_id,
+        lesson.get_previous_value("teacher"),
+        lesson.get_previous_value("student"),
+    }
+    users.discard(None)
+    return users
+
+
+def invalidate_users(user_ids):
+    """Новая версия занятости пользователей: старые записи кеша больше не совпадут."""
+    if not user_ids:
+        return
+    _, version_timeout = get_timeouts()
+    cache.set_many(
+        {_version_key(user_id): uuid.uuid4().hex for user_id in user_ids},
+        version_timeout,
+    )
@@ -0,0 +1,118 @@
+"""
+Read-through кеш сериализованных уроков (GET /lessons/{id}/) в Redis.
+
+Запись кеша хранит версию урока; версия меняется после коммита каждого
+изменения урока (см. signals.py), поэтому данные, прочитанные конкурентным
+запросом до коммита, никогда не будут отданы после него.
+
+aget_lesson_detail - тот же алгоритм для асинхронных представлений (ASGI):
+ожидание блокировки не занимает поток.
+"""
+
+import asyncio
+import time
+import uuid
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+
+# Меняется вместе с форматом ответа LessonSerializer и записи кеша.
+SCHEMA_VERSION = 2
+
+LOCK_TIMEOUT = 5
+LOCK_WAIT = 0.05
+LOCK_ATTEMPTS = 20
+
+# Счетчики процесса: hits, misses, lock_waits, lock_timeouts, invalidations.
+stats = Counter()
+
+
+def get_timeouts():
+    payload_timeout = getattr(settings, "LESSON_DETAIL_CACHE_TIMEOUT", 60 * 60)
+    # Версия живет дольше данных: истекшая версия не может совпасть со старой записью.
+    return payload_timeout, payload_timeout * 24
+
+
+def _keys(lesson_id):
+    prefix = f"lesson:{SCHEMA_VERSION}:{lesson_id}"
+    return f"{prefix}:version", f"{prefix}:detail", f"{prefix}:lock"
+
+
+def get_lesson_detail(lesson_id, load):
+    """
+    Возвращает (данные, попадание в кеш).
+
+    load() читает урок из БД и сериализует его. При промахе только один
+    запрос выполняет load() под блокировкой, остальные ждут его результат.
+    """
+    version_key, data_key, lock_key = _keys(lesson_id)
+    cached = cache.get_many([version_key, data_key])
+    version = cached.get(version_key)
+    entry = cached.get(data_key)
+    if entry is not None and entry["version"] == version:
+        stats["hits"] += 1
+        return entry["data"], True
+
+    stats["misses"] += 1
+    payload_timeout, _ = get_timeouts()
+
+    if not cache.add(lock_key, 1, LOCK_TIMEOUT):
+        for _ in range(LOCK_ATTEMPTS):
+            time.sleep(LOCK_WAIT)
+            entry = cache.get(data_key)
+            if entry is not None and entry["version"] == version:
+                stats["lock_waits"] += 1
+                return entry["data"], True
+        stats["lock_timeouts"] += 1
+        return load(), False
+
+    try:
+        data = load()
+        cache.set(data_key, {"version": version, "data": data}, payload_timeout)
+    finally:
+        cache.delete(lock_key)
+    return data, False
+
+
+async def aget_lesson_detail(lesson_id, aload):
+    """Асинхронный get_lesson_detail, aload() - корутина чтения урока."""
+    version_key, data_key, lock_key = _keys(lesson_id)
+    cached = await cache.aget_many([version_key, data_key])
+    version = cached.get(version_key)
+    entry = cached.get(data_key)
+    if entry is not None and entry["version"] == version:
+        stats["hits"] += 1
+        return entry["data"], True
+
+    stats["misses"] += 1
+    payload_timeout, _ = get_timeouts()
+
+    if not await cache.aadd(lock_key, 1, LOCK_TIMEOUT):
+        for _ in range(LOCK_ATTEMPTS):
+            await asyncio.sleep(LOCK_WAIT)
+            entry = await cache.aget(data_key)
+            if entry is not None and entry["version"] == version:
+                stats["lock_waits"] += 1
+                return entry["data"], True
+        stats["lock_timeouts"] += 1
+        return await aload(), False
+
+    try:
+        data = await aload()
+        await cache.aset(data_key, {"version": version, "data": data}, payload_timeout)
+    finally:
+        await cache.adelete(lock_key)
+    return data, False
+
+
+def invalidate_lessons(lesson_ids):
+    """Новая версия для уроков: старые записи кеша больше не совпадут."""
+    if not lesson_ids:
+        return
+    _, version_timeout = get_timeouts()
+    cache.set_many(
+        {_keys(lesson_id)[0]: uuid.uuid4().hex for lesson_id in lesson_ids},
+        version_timeout,
+    )
+    stats["invalidations"] += len(lesson_ids)
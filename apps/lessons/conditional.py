@@ -0,0 +1,83 @@
+"""
+Условные GET уроков: ETag и Last-Modified по Lesson.updated_at.
+
+updated_at меняется при каждом сохранении и переходе статуса, поэтому
+валидаторы ответа считаются по парам (id, updated_at) отданных уроков:
+
+- детали урока - по записи кеша (cache.py) или по загруженному уроку;
+- страница списка - по строкам страницы, которые читаются тем же запросом
+  по индексу, плюс наличие соседних страниц и адрес (от них зависят ссылки).
+
+Валидаторы берутся из тех же данных, что и тело ответа, поэтому ETag
+никогда не опережает тело. Совпавший If-None-Match (или If-Modified-Since
+без него) дает 304 без сериализации и рендеринга. Удаление урока меняет
+ETag страницы, но не всегда Last-Modified: клиентам лучше присылать
+If-None-Match.
+"""
+
+import hashlib
+from typing import NamedTuple
+
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from rest_framework.renderers import BrowsableAPIRenderer
+
+from .cache import SCHEMA_VERSION
+
+
+class Validators(NamedTuple):
+    etag: str
+    # Время последнего изменения, с; None для пустого списка.
+    last_modified: int | None
+
+
+def get_validators(request, rows, *parts):
+    """
+    Валидаторы ответа по строкам (id, updated_at) и прочим значениям, от
+    которых зависит тело. None для HTML-страниц DRF: в них пользователь и CSRF.
+    """
+    if isinstance(request.accepted_renderer, BrowsableAPIRenderer):
+        return None
+
+    digest = hashlib.sha256(
+        f"{SCHEMA_VERSION}\n{request.accepted_media_type}\n".encode()
+    )
+    for part in parts:
+        digest.update(f"{part}\n".encode())
+    last_modified = None
+    for lesson_id, updated_at in rows:
+        digest.update(f"{lesson_id}:{updated_at.isoformat()}\n".encode())
+        if last_modified is None or updated_at > last_modified:
+            last_modified = updated_at
+    return Validators(
+        etag=f'"{digest.hexdigest()[:32]}"',
+        last_modified=int(last_modified.timestamp()) if last_modified else None,
+    )
+
+
+def set_validators(response, validators):
+    if validators is not None:
+        response["ETag"] = validators.etag
+        if validators.last_modified is not None:
+            response["Last-Modified"] = http_date(validators.last_modified)
+        # Клиент проверяет ответ при каждом запросе, а не кеширует по эвристике
+        # от Last-Modified; private - ответ зависит от пользователя (role).
+        patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def conditional_response(request, rows, get_response, *parts):
+    """
+    304 (412 для If-Match), если уроки rows не изменились с версии клиента,
+    иначе get_response() с ETag и Last-Modified.
+    """
+    validators = get_validators(request, rows, *parts)
+    if validators is not None:
+        response = get_conditional_response(
+            request, etag=validators.etag, last_modified=validators.last_modified
+        )
+        if response is not None:
+            if response.status_code == 304:
+                set_validators(response, validators)
+            return response
+    return set_validators(get_response(), validators)
@@ -0,0 +1,50 @@
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.filters import BaseFilterBackend
+
+from .models import LessonStatus
+
+ROLE_TEACHER = "teacher"
+ROLE_STUDENT = "student"
+ROLES = [ROLE_TEACHER, ROLE_STUDENT]
+
+TRUE_VALUES = {"1", "true", "yes", "on"}
+
+
+class LessonFilterBackend(BaseFilterBackend):
+    """
+    Фильтрация уроков по параметрам запроса role, status и upcoming.
+
+    Порядок условий совпадает с составными индексами модели
+    (teacher|student, status, start_time), поэтому запросы идут по индексу.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        params = request.query_params
+
+        role = params.get("role")
+        if role:
+            if role not in ROLES:
+                raise serializers.ValidationError(
+                    {"role": f"Допустимые значения: {', '.join(ROLES)}"}
+                )
+            user = request.user
+            if not user.is_authenticated:
+                return queryset.none()
+            if role == ROLE_TEACHER:
+                queryset = queryset.filter(teacher_id=user.pk)
+            else:
+                queryset = queryset.filter(student_id=user.pk)
+
+        lesson_status = params.get("status")
+        if lesson_status:
+            if lesson_status not in LessonStatus.values:
+                raise serializers.ValidationError(
+                    {"status": f"Допустимые значения: {', '.join(LessonStatus.values)}"}
+                )
+            queryset = queryset.filter(status=lesson_status)
+
+        if params.get("upcoming", "").lower() in TRUE_VALUES:
+            queryset = queryset.filter(start_time__gte=timezone.now())
+
+        return queryset
@@ -0,0 +1,381 @@
+import contextlib
+import gc
+import json
+import logging
+import os
+import platform
+import random
+import statistics
+import subprocess
+import time
+from datetime import timedelta
+from urllib.parse import urlsplit, urlunsplit
+
+import django
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Max, Min
+from django.test import Client
+from django.test.utils import override_settings
+from django.utils import timezone
+from django_redis import get_redis_connection
+
+from apps.lessons.models import Lesson, LessonDailyStat, LessonEvent, LessonStatus
+
+User = get_user_model()
+
+SIZES = [10_000, 100_000, 1_000_000]
+
+# Метрики, по которым результат сравнивается с базовым: рост - регрессия,
+# для throughput - падение.
+LATENCY_KEYS = ("p50_ms", "p95_ms")
+MEDIAN_KEYS = ("p50_ms", "p95_ms", "p99_ms", "mean_ms", "throughput_rps")
+# Среднее число SQL зависит от доли попаданий в кеш при другом --requests.
+QUERIES_TOLERANCE = 0.05
+
+
+class Command(BaseCommand):
+    help = (
+        "Нагрузочный тест API уроков на наборах 10k/100k/1M уроков: list, "
+        "retrieve, create, start, complete, cancel через тестовый клиент Django. "
+        "Данные создаются в отдельной БД (test_<DB_NAME>) и отдельной базе Redis. "
+        "Пишет p50/p95/p99, throughput и число SQL на запрос в JSON и сравнивает "
+        "с результатами другого коммита (--baseline)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+        parser.add_argument(
+            "--requests", type=int, default=200, help="Запросов на сценарий"
+        )
+        parser.add_argument("--warmup", type=int, default=20)
+        parser.add_argument(
+            "--rounds",
+            type=int,
+            default=3,
+            help="Проходов по всем сценариям, в результат идет медиана",
+        )
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument(
+            "--redis-db",
+            type=int,
+            default=15,
+            help="База Redis для кеша и напоминаний на время теста, очищается",
+        )
+        parser.add_argument(
+            "--keepdb",
+            action="store_true",
+            help="Не пересоздавать тестовую БД и не удалять ее после теста",
+        )
+        parser.add_argument("--output", help="Файл для результатов (JSON)")
+        parser.add_argument("--baseline", help="Результаты для сравнения (JSON)")
+        parser.add_argument(
+            "--results",
+            help="Сравнить готовые результаты с --baseline без запуска теста",
+        )
+        parser.add_argument(
+            "--threshold",
+            type=float,
+            default=0.2,
+            help="Допустимое ухудшение латентности и throughput, доля",
+        )
+
+    def handle(self, *args, **options):
+        if options["results"]:
+            if not options["baseline"]:
+                raise CommandError("--results сравнивается только с --baseline")
+            report = self.load(options["results"])
+        else:
+            report = self.run(options)
+            if options["output"]:
+                with open(options["output"], "w") as f:
+                    json.dump(report, f, ensure_ascii=False, indent=2)
+                self.stdout.write(f"Результаты записаны в {options['output']}")
+
+        if options["baseline"]:
+            self.compare(self.load(options["baseline"]), report, options["threshold"])
+
+    def run(self, options):
+        report = {
+            "meta": {
+                "commit": git_commit(),
+                "created_at": timezone.now().isoformat(),
+                "python": platform.python_version(),
+                "django": django.get_version(),
+                "requests": options["requests"],
+                "warmup": options["warmup"],
+                "rounds": options["rounds"],
+                "seed": options["seed"],
+            },
+            "results": {},
+        }
+
+        test_settings = {
+            # DEBUG копирует каждый SQL в connection.queries.
+            "DEBUG": False,
+            "ALLOWED_HOSTS": ["testserver"],
+            "CACHES": redis_db_caches(options["redis_db"]),
+        }
+        creation = connection.creation
+        old_name = connection.settings_dict["NAME"]
+        self.stdout.write("Создаем тестовую БД...")
+        creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False, keepdb=options["keepdb"]
+        )
+        # Построчный лог каждого изменения урока в консоль искажает замеры.
+        logging.disable(logging.INFO)
+        try:
+            with override_settings(**test_settings):
+                for size in options["sizes"]:
+                    self.seed(size, options)
+                    report["results"][str(size)] = self.benchmark(size, options)
+        finally:
+            logging.disable(logging.NOTSET)
+            creation.destroy_test_db(old_name, verbosity=0, keepdb=options["keepdb"])
+        return report
+
+    def seed(self, size, options):
+        self.stdout.write(f"Набор {size} уроков: заполнение...")
+        tables = ", ".join(
+            connection.ops.quote_name(model._meta.db_table)
+            for model in (LessonEvent, LessonDailyStat, Lesson, User)
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(f"TRUNCATE {tables} RESTART IDENTITY CASCADE")
+        get_redis_connection("default").flushdb()
+
+        users = max(50, size // 2000)
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            call_command(
+                "seed_data",
+                teachers=users,
+                students=users,
+                lessons=size,
+                seed=options["seed"],
+            )
+        # COPY не обновляет статистику планировщика.
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"ANALYZE {connection.ops.quote_name(Lesson._meta.db_table)}"
+            )
+
+    def benchmark(self, size, options):
+        rng = random.Random(options["seed"])
+        # Каждый запрос переходов и создания получает свой урок или слот.
+        count = (options["warmup"] + options["requests"]) * options["rounds"]
+
+        bounds = Lesson.objects.aggregate(low=Min("id"), high=Max("id"))
+        scheduled = list(
+            Lesson.objects.filter(status=LessonStatus.SCHEDULED)
+            .order_by("id")
+            .values_list("id", flat=True)[: count * 2]
+        )
+        if len(scheduled) < count * 2:
+            raise CommandError(f"Мало запланированных уроков в наборе {size}")
+        started_ids, cancelled_ids = scheduled[:count], scheduled[count:]
+
+        teacher = User.objects.filter(username__startswith="teacher_").first()
+        students = list(
+            User.objects.filter(username__startswith="student_").values_list(
+                "id", flat=True
+            )
+        )
+        # Далеко за пределами расписания seed_data, без пересечений.
+        first_slot = timezone.now().replace(microsecond=0) + timedelta(days=3 * 365)
+
+        def create_data(i):
+            start = first_slot + timedelta(hours=2 * i)
+            return {
+                "title": f"Урок {i}",
+                "student": rng.choice(students),
+                "start_time": start.isoformat(),
+                "end_time": (start + timedelta(hours=1)).isoformat(),
+                "status": LessonStatus.SCHEDULED,
+            }
+
+        scenarios = {
+            "list": lambda i: ("get", "/api/v1/lessons/", None),
+            "list_filtered": lambda i: (
+                "get",
+                "/api/v1/lessons/?status=scheduled&upcoming=true",
+                None,
+            ),
+            "retrieve": lambda i: (
+                "get",
+                f"/api/v1/lessons/{rng.randint(bounds['low'], bounds['high'])}/",
+                None,
+            ),
+            "create": lambda i: ("post", "/api/v1/lessons/", create_data(i)),
+            "start": lambda i: (
+                "post",
+                f"/api/v1/lessons/{started_ids[i]}/start/",
+                None,
+            ),
+            "complete": lambda i: (
+                "post",
+                f"/api/v1/lessons/{started_ids[i]}/complete/",
+                None,
+            ),
+            "cancel": lambda i: (
+                "post",
+                f"/api/v1/lessons/{cancelled_ids[i]}/cancel/",
+                None,
+            ),
+        }
+
+        client = Client()
+        client.force_login(teacher)
+        # Сценарии чередуются по проходам, чтобы фоновые колебания нагрузки
+        # не доставались одному сценарию.
+        rounds = {name: [] for name in scenarios}
+        for number in range(options["rounds"]):
+            for name, make_request in scenarios.items():
+                rounds[name].append(self.measure(client, make_request, options, number))
+
+        results = {}
+        for name, measured in rounds.items():
+            results[name] = merge_rounds(measured)
+            self.stdout.write(f"{size:>8} {name:<14} {format_result(results[name])}")
+        return results
+
+    def measure(self, client, make_request, options, number):
+        queries = []
+
+        def count_queries(execute, sql, params, many, context):
+            queries[-1] += 1
+            return execute(sql, params, many, context)
+
+        # Мусор предыдущего сценария не собирается посреди замеров этого.
+        gc.collect()
+        latencies, errors = [], 0
+        per_round = options["warmup"] + options["requests"]
+        with connection.execute_wrapper(count_queries):
+            for i in range(per_round):
+                method, path, data = make_request(number * per_round + i)
+                queries.append(0)
+                started = time.perf_counter()
+                if method == "get":
+                    response = client.get(path)
+                else:
+                    response = client.post(path, data, content_type="application/json")
+                elapsed = time.perf_counter() - started
+                if i < options["warmup"]:
+                    queries.pop()
+                    continue
+                latencies.append(elapsed * 1000)
+                errors += response.status_code >= 400
+
+        percentiles = statistics.quantiles(latencies, n=100, method="inclusive")
+        return {
+            "requests": len(latencies),
+            "errors": errors,
+            "p50_ms": round(percentiles[49], 3),
+            "p95_ms": round(percentiles[94], 3),
+            "p99_ms": round(percentiles[98], 3),
+            "mean_ms": round(statistics.fmean(latencies), 3),
+            "throughput_rps": round(len(latencies) / (sum(latencies) / 1000), 1),
+            "queries_per_request": statistics.fmean(queries),
+            "max_queries": max(queries),
+        }
+
+    def compare(self, baseline, report, threshold):
+        self.stdout.write(
+            f"Сравнение с {baseline['meta'].get('commit') or 'baseline'} "
+            f"(порог {threshold:.0%})"
+        )
+        regressions = []
+        for size, scenarios in report["results"].items():
+            for name, current in scenarios.items():
+                base = baseline["results"].get(size, {}).get(name)
+                if base is None:
+                    continue
+
+                changes, failed = [], []
+                for key in LATENCY_KEYS:
+                    change = current[key] / base[key] - 1
+                    changes.append(f"{key} {change:+.0%}")
+                    if change > threshold:
+                        failed.append(key)
+                change = current["throughput_rps"] / base["throughput_rps"] - 1
+                changes.append(f"rps {change:+.0%}")
+                if change < -threshold:
+                    failed.append("throughput_rps")
+                # Число запросов к БД детерминировано: любой рост - регрессия.
+                delta = current["queries_per_request"] - base["queries_per_request"]
+                changes.append(f"sql {delta:+.2f}")
+                if delta > QUERIES_TOLERANCE:
+                    failed.append("queries_per_request")
+
+                line = f"{size:>8} {name:<14} {', '.join(changes)}"
+                if failed:
+                    regressions.append(f"{size} {name}: {', '.join(failed)}")
+                    self.stdout.write(self.style.ERROR(line))
+                else:
+                    self.stdout.write(line)
+
+        if regressions:
+            raise CommandError(
+                "Регрессия производительности:\n" + "\n".join(regressions)
+            )
+        self.stdout.write(self.style.SUCCESS("Регрессий нет"))
+
+    def load(self, path):
+        with open(path) as f:
+            return json.load(f)
+
+
+def merge_rounds(rounds):
+    """Медиана метрик по проходам, число SQL - по всем запросам."""
+    requests = sum(result["requests"] for result in rounds)
+    merged = {
+        "requests": requests,
+        "errors": sum(result["errors"] for result in rounds),
+    }
+    for key in MEDIAN_KEYS:
+        merged[key] = round(statistics.median(result[key] for result in rounds), 3)
+    merged["queries_per_request"] = round(
+        sum(r["queries_per_request"] * r["requests"] for r in rounds) / requests, 2
+    )
+    merged["max_queries"] = max(result["max_queries"] for result in rounds)
+    return merged
+
+
+def format_result(result):
+    return (
+        f"p50 {result['p50_ms']:8.2f} мс  p95 {result['p95_ms']:8.2f} мс  "
+        f"p99 {result['p99_ms']:8.2f} мс  {result['throughput_rps']:8.1f} rps  "
+        f"SQL {result['queries_per_request']:5.2f}  ошибок {result['errors']}"
+    )
+
+
+def redis_db_caches(db):
+    """Настройки CACHES с другой базой Redis в LOCATION."""
+    caches = {alias: dict(config) for alias, config in settings.CACHES.items()}
+    config = caches["default"]
+    locations = config["LOCATION"]
+    if isinstance(locations, str):
+        locations = [locations]
+
+    replaced = []
+    for location in locations:
+        parts = urlsplit(location)
+        if parts.path.strip("/") == str(db):
+            raise CommandError(f"База Redis {db} уже используется кешем приложения")
+        replaced.append(urlunsplit(parts._replace(path=f"/{db}")))
+    config["LOCATION"] = replaced
+    return caches
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
@@ -0,0 +1,74 @@
+from django.core.management.base import BaseCommand
+
+from apps.lessons.notifications import (
+    LESSON_CREATED,
+    FakeTransport,
+    Notification,
+    deliver,
+    get_config,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнивает пропускную способность доставки уведомлений (уведомлений/с): "
+        "прежние задачи (одна блокирующая задержка на уведомление в каждом из "
+        "воркеров) против пакетной конкурентной доставки. БД и брокер не нужны."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--count", type=int, default=2000)
+        parser.add_argument("--recipients", type=int, default=500)
+        parser.add_argument(
+            "--latency",
+            type=float,
+            default=0.05,
+            help="Задержка внешнего сервиса на одну отправку, с",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=4,
+            help="Число prefork-воркеров Celery (--concurrency)",
+        )
+        parser.add_argument(
+            "--legacy-sample",
+            type=int,
+            default=40,
+            help="Сколько уведомлений отправить последовательно для замера прежнего режима",
+        )
+
+    def handle(self, *args, **options):
+        notifications = [
+            Notification(LESSON_CREATED, i, i % options["recipients"], f"Урок {i}")
+            for i in range(options["count"])
+        ]
+        latency = options["latency"]
+
+        # Прежние задачи: одно уведомление на задачу, ожидание блокирует процесс.
+        legacy = deliver(
+            notifications[: options["legacy_sample"]],
+            transport=FakeTransport(latency=latency),
+            concurrency=1,
+            batch_size=1,
+        )
+        legacy_rate = legacy.rate * options["workers"]
+
+        config = get_config()
+        batched = deliver(notifications, transport=FakeTransport(latency=latency))
+        batched_rate = batched.rate * options["workers"]
+
+        self.stdout.write(
+            f"Задержка сервиса {latency * 1000:.0f} мс, "
+            f"{options['count']} уведомлений, {options['recipients']} получателей, "
+            f"{options['workers']} воркеров"
+        )
+        self.stdout.write(f"Прежние задачи:      {legacy_rate:10.1f} уведомлений/с")
+        self.stdout.write(
+            f"Пакетная доставка:   {batched_rate:10.1f} уведомлений/с "
+            f"(concurrency={config['CONCURRENCY']}, batch_size={config['BATCH_SIZE']}, "
+            f"{len(batched.sent)} за {batched.elapsed:.2f} с на воркер)"
+        )
+        self.stdout.write(
+            self.style.SUCCESS(f"Ускорение: x{batched_rate / legacy_rate:.0f}")
+        )
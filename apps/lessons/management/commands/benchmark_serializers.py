@@ -0,0 +1,57 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+
+from apps.lessons.models import Lesson
+from apps.lessons.serializers import LessonRowSerializer, LessonSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнивает скорость (уроков/с) LessonSerializer и LessonRowSerializer "
+        "на выборке уроков: запрос, сериализация и рендеринг JSON. "
+        "Проверяет, что ответы совпадают байт в байт."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, nargs="+", default=[10000, 100000])
+        parser.add_argument("--repeat", type=int, default=3)
+
+    def handle(self, *args, **options):
+        renderer = JSONRenderer()
+
+        def current(rows):
+            lessons = list(Lesson.objects.all()[:rows])
+            return renderer.render(LessonSerializer(lessons, many=True).data)
+
+        def fast(rows):
+            serializer = LessonRowSerializer()
+            lessons = serializer.values(Lesson.objects.all()[:rows])
+            return renderer.render(serializer.serialize(lessons))
+
+        for rows in options["rows"]:
+            expected, actual = current(rows), fast(rows)
+            if expected != actual:
+                raise CommandError(f"Ответы различаются на выборке {rows} уроков")
+
+            rates = {}
+            for name, func in (
+                ("LessonSerializer", current),
+                ("LessonRowSerializer", fast),
+            ):
+                best = min(self.measure(func, rows) for _ in range(options["repeat"]))
+                rates[name] = rows / best
+                self.stdout.write(
+                    f"{rows:>8} уроков  {name:<20} {best:8.3f} с  {rates[name]:>10.0f} уроков/с"
+                )
+
+            speedup = rates["LessonRowSerializer"] / rates["LessonSerializer"]
+            self.stdout.write(
+                self.style.SUCCESS(f"{rows:>8} уроков  ускорение x{speedup:.1f}")
+            )
+
+    def measure(self, func, rows):
+        started = time.perf_counter()
+        func(rows)
+        return time.perf_counter() - started
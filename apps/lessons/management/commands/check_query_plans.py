@@ -0,0 +1,105 @@
+import json
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from apps.lessons.models import Lesson, LessonStatus
+from apps.lessons.views import LessonViewSet
+
+TABLE = Lesson._meta.db_table
+
+SCENARIOS = [
+    {},
+    {"status": LessonStatus.SCHEDULED},
+    {"role": "teacher"},
+    {"role": "teacher", "status": LessonStatus.SCHEDULED},
+    {"role": "student", "status": LessonStatus.COMPLETED},
+    {"role": "student", "status": LessonStatus.SCHEDULED, "upcoming": "true"},
+]
+
+
+def iter_plan_nodes(node):
+    yield node
+    for child in node.get("Plans", []):
+        yield from iter_plan_nodes(child)
+
+
+class Command(BaseCommand):
+    help = (
+        "Проверяет планы запросов списка уроков (EXPLAIN) и падает, если "
+        "таблица уроков читается последовательным сканированием. "
+        "Имеет смысл на большой таблице (см. seed_data)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--analyze",
+            action="store_true",
+            help="Выполнять EXPLAIN ANALYZE (реально исполняет запросы)",
+        )
+        parser.add_argument("--verbose-plans", action="store_true")
+
+    def handle(self, *args, **options):
+        lesson = Lesson.objects.only("teacher_id", "student_id").first()
+        if lesson is None:
+            raise CommandError("Таблица уроков пуста, сначала запустите seed_data")
+
+        users = {"teacher": lesson.teacher, "student": lesson.student}
+        factory = APIRequestFactory()
+        failed = []
+
+        # Урок из середины таблицы: позиция курсора для «глубокой» страницы.
+        middle_id = Lesson.objects.aggregate(max_id=Max("id"))["max_id"] // 2
+        middle = Lesson.objects.filter(id__gte=middle_id).order_by("id").first()
+
+        for params in SCENARIOS:
+            for deep in (False, True):
+                request = Request(factory.get("/api/v1/lessons/", params))
+                request.user = users.get(params.get("role"), AnonymousUser())
+
+                view = LessonViewSet(request=request, format_kwarg=None, action="list")
+                queryset = view.filter_queryset(view.get_queryset())
+                queryset = self.paginate(view, queryset, middle if deep else None)
+
+                raw = queryset.explain(format="json", analyze=options["analyze"])
+                plan = json.loads(raw)[0]["Plan"]
+                nodes = [
+                    node
+                    for node in iter_plan_nodes(plan)
+                    if node.get("Relation Name") == TABLE
+                ]
+                seq_scan = any(node["Node Type"] == "Seq Scan" for node in nodes)
+                used = ", ".join(
+                    f"{node['Node Type']} ({node.get('Index Name', '-')})"
+                    for node in nodes
+                )
+
+                label = "&".join(f"{k}={v}" for k, v in params.items())
+                label = (label or "<без фильтров>") + (
+                    " [глубокая страница]" if deep else ""
+                )
+                if seq_scan:
+                    failed.append(label)
+                    self.stdout.write(self.style.ERROR(f"SEQ SCAN  {label}: {used}"))
+                else:
+                    self.stdout.write(self.style.SUCCESS(f"OK        {label}: {used}"))
+
+                if options["verbose_plans"]:
+                    self.stdout.write(json.dumps(plan, indent=2, ensure_ascii=False))
+
+        if failed:
+            raise CommandError(f"Последовательное сканирование: {', '.join(failed)}")
+
+    def paginate(self, view, queryset, after=None):
+        """Запрос страницы так, как его выполняет LessonCursorPagination."""
+        paginator = view.paginator
+        queryset = queryset.order_by(*paginator.ordering)
+        if after is not None:
+            position = paginator._get_position_from_instance(after, paginator.ordering)
+            queryset = queryset.filter(
+                paginator.get_keyset_filter(position, reverse=False)
+            )
+        return queryset[: paginator.page_size + 1]
@@ -0,0 +1,26 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.openapi import write_specs
+
+
+class Command(BaseCommand):
+    help = (
+        "Генерирует OpenAPI-схему в OPENAPI_SCHEMA_DIR. Запускается при сборке "
+        "образа, /swagger/ и /redoc/ отдают схему из этих файлов."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--output",
+            default=settings.OPENAPI_SCHEMA_DIR,
+            help="Каталог для файлов схемы",
+        )
+
+    def handle(self, *args, **options):
+        specs = write_specs(options["output"])
+        for filename, content in sorted(specs.items()):
+            path = os.path.join(options["output"], filename)
+            self.stdout.write(self.style.SUCCESS(f"{path}: {len(content)} байт"))
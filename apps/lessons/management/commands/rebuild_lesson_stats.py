@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.lessons.stats import rebuild_stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Пересчитывает сводную статистику уроков (преподаватель, день, статус) "
+        "по таблице уроков. Нужна после массовых изменений в обход сигналов "
+        "(QuerySet.update, bulk_create, COPY)."
+    )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        rows = rebuild_stats()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Сводка пересчитана: {rows} строк за {time.monotonic() - started:.1f} с"
+            )
+        )
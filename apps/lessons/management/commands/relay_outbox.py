@@ -0,0 +1,72 @@
+import logging
+import time
+from itertools import groupby
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.lessons.models import LessonEvent
+from apps.lessons.tasks import deliver_lesson_notifications
+
+logger = logging.getLogger("lessons")
+
+
+def relay_batch(batch_size):
+    """
+    Публикует одну пачку событий outbox в Celery и удаляет их.
+
+    Строки блокируются с SKIP LOCKED, поэтому можно запускать несколько
+    relay-процессов. Подряд идущие события одного типа уходят одной задачей
+    пакетной доставки, порядок событий сохраняется. Если брокер недоступен,
+    транзакция откатывается и события остаются в outbox.
+    """
+    with transaction.atomic():
+        events = list(
+            LessonEvent.objects.select_for_update(skip_locked=True)
+            .order_by("id")
+            .values_list("id", "kind", "lesson_id")[:batch_size]
+        )
+        if not events:
+            return 0
+
+        for kind, run in groupby(events, key=lambda event: event[1]):
+            deliver_lesson_notifications.delay(kind, [event[2] for event in run])
+
+        LessonEvent.objects.filter(id__in=[event[0] for event in events]).delete()
+    return len(events)
+
+
+class Command(BaseCommand):
+    help = "Relay transactional outbox: доставляет события уроков в Celery пачками"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=1.0,
+            help="Пауза между опросами пустого outbox, с",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Опустошить outbox и завершиться",
+        )
+
+    def handle(self, *args, **options):
+        logger.info("Outbox relay запущен")
+        while True:
+            try:
+                relayed = relay_batch(options["batch_size"])
+            except Exception as exc:
+                logger.error(f"Ошибка relay outbox: {exc}")
+                relayed = 0
+                if options["once"]:
+                    raise
+
+            if relayed:
+                logger.info(f"Outbox: опубликовано {relayed} событий")
+                continue
+            if options["once"]:
+                return
+            time.sleep(options["interval"])
@@ -0,0 +1,58 @@
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.lessons.reminders import dispatch_due, get_config, rebuild_reminders
+
+logger = logging.getLogger("lessons")
+
+
+class Command(BaseCommand):
+    help = (
+        "Опрашивает sorted set напоминаний в Redis и отправляет наступившие "
+        "напоминания об уроках пачками. Должен работать в одном экземпляре."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=None)
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=1.0,
+            help="Пауза между опросами, когда наступивших напоминаний нет, с",
+        )
+        parser.add_argument(
+            "--rebuild",
+            action="store_true",
+            help="Перед запуском заполнить напоминания заново по урокам из БД",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Отправить наступившие напоминания и завершиться",
+        )
+
+    def handle(self, *args, **options):
+        if options["rebuild"]:
+            total = rebuild_reminders()
+            logger.info(f"Напоминания заполнены заново: {total} уроков")
+
+        batch_size = options["batch_size"] or get_config()["BATCH_SIZE"]
+        logger.info("Опрос напоминаний запущен")
+        while True:
+            try:
+                dispatched = dispatch_due(batch_size)
+            except Exception as exc:
+                logger.error(f"Ошибка отправки напоминаний: {exc}")
+                dispatched = 0
+                if options["once"]:
+                    raise
+
+            if dispatched:
+                logger.info(f"Напоминания: обработано {dispatched}")
+                if dispatched == batch_size:
+                    continue
+            if options["once"]:
+                return
+            time.sleep(options["interval"])
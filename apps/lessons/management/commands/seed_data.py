@@ -1,87 +1,205 @@
+import io
 import random
-from datetime import timedelta
+import time
+from datetime import datetime, timedelta
+from itertools import islice
 
 from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
 from django.core.management.base import BaseCommand
+from django.db import connection, transaction
 from django.utils import timezone
 
-from apps.lessons.models import Lesson
+from apps.lessons.models import Lesson, LessonStatus
+from apps.lessons.stats import rebuild_stats
 
 User = get_user_model()
 
+SUBJECTS = [
+    "математике",
+    "физике",
+    "химии",
+    "английскому",
+    "истории",
+    "биологии",
+    "географии",
+    "литературе",
+    "информатике",
+    "музыке",
+]
+
+# Двухчасовые слоты расписания: урок (сдвиг до 15 минут + до 90 минут) не выходит
+# за границы слота, поэтому уроки из разных слотов никогда не пересекаются,
+# а внутри слота у каждого преподавателя и студента не больше одного урока.
+SLOT_HOURS = [8, 10, 12, 14, 16, 18, 20]
+DURATIONS_MINUTES = [45, 60, 90]
+
+# Доля занятых преподавателей/студентов в одном слоте.
+SLOT_LOAD = 0.5
+
+PAST_STATUSES = ([LessonStatus.COMPLETED, LessonStatus.CANCELLED], [85, 15])
+FUTURE_STATUSES = (
+    [LessonStatus.SCHEDULED, LessonStatus.DRAFT, LessonStatus.CANCELLED],
+    [80, 10, 10],
+)
+
+COPY_COLUMNS = [
+    "title",
+    "description",
+    "start_time",
+    "end_time",
+    "status",
+    "created_at",
+    "updated_at",
+    "teacher_id",
+    "student_id",
+]
+
 
 class Command(BaseCommand):
-    help = "Создает тестовых пользователей и уроки"
+    help = (
+        "Создает тестовых пользователей и уроки. Уроки генерируются потоково "
+        "пачками через COPY без сигналов и валидации, без пересечений "
+        "по времени у преподавателей и студентов."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--teachers", type=int, default=5)
+        parser.add_argument("--students", type=int, default=5)
+        parser.add_argument("--lessons", type=int, default=10)
+        parser.add_argument("--seed", type=int, default=None)
+        parser.add_argument("--batch-size", type=int, default=10000)
+        parser.add_argument(
+            "--future-share",
+            type=float,
+            default=0.2,
+            help="Доля дней расписания в будущем",
+        )
+        parser.add_argument(
+            "--append",
+            action="store_true",
+            help="Создать данные, даже если тестовые пользователи уже есть",
+        )
 
     def handle(self, *args, **options):
-        if User.objects.exists():
+        if (
+            not options["append"]
+            and User.objects.filter(username__startswith="teacher_").exists()
+        ):
             print("Данные уже есть, пропускаем")
             return
 
-        print("Создаем тестовые данные...")
-
-        teachers = []
-        students = []
+        rng = random.Random(options["seed"])
+        # Уникальный префикс запуска, чтобы --append не конфликтовал по username.
+        run = f"{rng.getrandbits(24):06x}_" if options["append"] else ""
 
-        for i in range(1, 6):
-            teacher = User.objects.create_user(
-                username=f"teacher_{i}",
-                password="123456",
-                email=f"teacher{i}@mail.ru",
-                first_name=f"Учитель_{i}",
-                last_name="Тестовый",
-            )
-            teachers.append(teacher)
-        print(f"Созданы 5 учителей")
-
-        for i in range(1, 6):
-            student = User.objects.create_user(
-                username=f"student_{i}",
-                password="123456",
-                email=f"student{i}@mail.ru",
-                first_name=f"Ученик_{i}",
+        print("Создаем тестовые данные...")
+        started = time.monotonic()
+
+        # Один хеш на всех: PBKDF2 на каждого пользователя слишком дорог.
+        password = make_password("123456")
+        teachers = self.create_users(
+            "teacher", "Учитель", options["teachers"], run, password, options
+        )
+        print(f"Созданы {len(teachers)} учителей")
+        students = self.create_users(
+            "student", "Ученик", options["students"], run, password, options
+        )
+        print(f"Созданы {len(students)} учеников")
+
+        rows = self.generate_lessons(rng, teachers, students, options)
+        created = 0
+        while batch := list(islice(rows, options["batch_size"])):
+            with transaction.atomic():
+                self.copy_lessons(batch)
+            created += len(batch)
+            if created % (options["batch_size"] * 10) == 0:
+                print(f"  ... {created} уроков")
+
+        # COPY идет в обход сигналов, сводку статистики считаем заново.
+        rebuild_stats()
+
+        elapsed = time.monotonic() - started
+        print(
+            f"Создано {created} уроков за {elapsed:.1f} с "
+            f"({created / max(elapsed, 1e-9):.0f} уроков/с)"
+        )
+
+    def create_users(self, role, first_name, count, run, password, options):
+        users = (
+            User(
+                username=f"{role}_{run}{i}",
+                password=password,
+                email=f"{role}{run}{i}@mail.ru",
+                first_name=f"{first_name}_{i}",
                 last_name="Тестовый",
             )
-            students.append(student)
-        print(f"Созданы 5 учеников")
-
-        subjects = [
-            "математике",
-            "физике",
-            "химии",
-            "английскому",
-            "истории",
-            "биологии",
-            "географии",
-            "литературе",
-            "информатике",
-            "музыке",
-        ]
-
-        statuses = ["draft", "scheduled", "completed", "cancelled", "in_progress"]
-
-        for i in range(10):
-            teacher = random.choice(teachers)
-            student = random.choice(students)
-
-            days = random.randint(-5, 10)
-            start = timezone.now() + timedelta(days=days)
-
-            end = start + timedelta(hours=random.randint(1, 2))
-
-            status = random.choice(statuses)
-
-            if status == "completed":
-                start = timezone.now() - timedelta(days=random.randint(1, 10))
-                end = start + timedelta(hours=2)
-
-            Lesson.objects.create(
-                title=f"Урок по {subjects[i]}",
-                teacher=teacher,
-                student=student,
-                start_time=start,
-                end_time=end,
-                status=status,
-            )
-
-        print(f"Создано 10 уроков")
+            for i in range(1, count + 1)
+        )
+        ids = []
+        while batch := list(islice(users, options["batch_size"])):
+            ids.extend(user.pk for user in User.objects.bulk_create(batch))
+        return ids
+
+    def copy_lessons(self, rows):
+        """Загружает пачку строк уроков одной командой COPY."""
+        buffer = io.StringIO()
+        for row in rows:
+            buffer.write("\t".join(row))
+            buffer.write("\n")
+        buffer.seek(0)
+
+        sql = f"COPY {Lesson._meta.db_table} ({', '.join(COPY_COLUMNS)}) FROM STDIN"
+        with connection.cursor() as cursor:
+            if hasattr(cursor, "copy_expert"):
+                cursor.copy_expert(sql, buffer)
+            else:
+                with cursor.copy(sql) as copy:
+                    copy.write(buffer.getvalue())
+
+    def generate_lessons(self, rng, teachers, students, options):
+        """Генератор строк уроков по слотам расписания, начиная с самого раннего дня."""
+        total = options["lessons"]
+        per_slot = max(1, int(min(len(teachers), len(students)) * SLOT_LOAD))
+        days = -(-total // (per_slot * len(SLOT_HOURS)))
+        future_days = int(days * options["future_share"])
+
+        now = timezone.now()
+        created_at = now.isoformat()
+        today = timezone.localdate()
+        tz = timezone.get_current_timezone()
+
+        produced = 0
+        for day_offset in range(future_days - days, future_days + 1):
+            day = today + timedelta(days=day_offset)
+            for hour in SLOT_HOURS:
+                slot_start = datetime(day.year, day.month, day.day, hour, tzinfo=tz)
+                pairs = zip(
+                    rng.sample(teachers, per_slot), rng.sample(students, per_slot)
+                )
+                for teacher_id, student_id in pairs:
+                    if produced == total:
+                        return
+                    start = slot_start + timedelta(minutes=rng.choice([0, 15]))
+                    end = start + timedelta(minutes=rng.choice(DURATIONS_MINUTES))
+                    yield (
+                        f"Урок по {rng.choice(SUBJECTS)}",
+                        "",
+                        start.isoformat(),
+                        end.isoformat(),
+                        self.pick_status(rng, start, end, now),
+                        created_at,
+                        created_at,
+                        str(teacher_id),
+                        str(student_id),
+                    )
+                    produced += 1
+
+    def pick_status(self, rng, start, end, now):
+        if end <= now:
+            statuses, weights = PAST_STATUSES
+        elif start <= now:
+            return LessonStatus.IN_PROGRESS
+        else:
+            statuses, weights = FUTURE_STATUSES
+        return rng.choices(statuses, weights)[0]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.9 on 2026-10-18 20:01
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("lessons", "0001_initial"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="lesson",
+            index=models.Index(
+                fields=["teacher", "status", "-start_time"],
+                name="lesson_teacher_status_start",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="lesson",
+            index=models.Index(
+                fields=["student", "status", "-start_time"],
+                name="lesson_student_status_start",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="lesson",
+            index=models.Index(
+                fields=["status", "-start_time"], name="lesson_status_start"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="lesson",
+            index=models.Index(fields=["-start_time"], name="lesson_start"),
+        ),
+    ]
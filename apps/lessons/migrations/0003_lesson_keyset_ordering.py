@@ -0,0 +1,31 @@
+# Generated by Django 5.2.9 on 2026-10-18 20:03
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("lessons", "0002_lesson_filter_indexes"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name="lesson",
+            options={
+                "ordering": ["-start_time", "-id"],
+                "verbose_name": "Урок",
+                "verbose_name_plural": "Уроки",
+            },
+        ),
+        migrations.RemoveIndex(
+            model_name="lesson",
+            name="lesson_start",
+        ),
+        migrations.AddIndex(
+            model_name="lesson",
+            index=models.Index(fields=["-start_time", "-id"], name="lesson_start_id"),
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.9 on 2026-10-18 20:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("lessons", "0003_lesson_keyset_ordering"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="LessonEvent",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("lesson_id", models.BigIntegerField(verbose_name="ID урока")),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[
+                            ("lesson_created", "Урок создан"),
+                            ("lesson_started", "Урок начат"),
+                            ("lesson_completed", "Урок завершен"),
+                            ("lesson_cancelled", "Урок отменен"),
+                        ],
+                        max_length=32,
+                        verbose_name="Тип события",
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        auto_now_add=True, verbose_name="Дата создания"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Событие урока",
+                "verbose_name_plural": "События уроков",
+                "ordering": ["id"],
+            },
+        ),
+    ]
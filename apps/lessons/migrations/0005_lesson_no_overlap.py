@@ -0,0 +1,44 @@
+# Generated by Django 5.2.9 on 2026-10-18 20:23
+
+import apps.lessons.models
+import django.contrib.postgres.constraints
+from django.contrib.postgres.operations import BtreeGistExtension
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("lessons", "0004_lesson_event_outbox"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        # Оператор = для bigint в GiST-индексе.
+        BtreeGistExtension(),
+        migrations.AddConstraint(
+            model_name="lesson",
+            constraint=django.contrib.postgres.constraints.ExclusionConstraint(
+                condition=models.Q(("status", "cancelled"), _negated=True),
+                expressions=[
+                    ("teacher", "="),
+                    (apps.lessons.models.TsTzRange("start_time", "end_time"), "&&"),
+                ],
+                name="lesson_teacher_no_overlap",
+                violation_error_message="У преподавателя уже есть урок в это время.",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="lesson",
+            constraint=django.contrib.postgres.constraints.ExclusionConstraint(
+                condition=models.Q(("status", "cancelled"), _negated=True),
+                expressions=[
+                    ("student", "="),
+                    (apps.lessons.models.TsTzRange("start_time", "end_time"), "&&"),
+                ],
+                name="lesson_student_no_overlap",
+                violation_error_message="У студента уже есть урок в это время.",
+            ),
+        ),
+    ]
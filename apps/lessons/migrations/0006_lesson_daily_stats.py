@@ -0,0 +1,89 @@
+# Generated by Django 5.2.9 on 2026-10-18 20:31
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def fill_stats(apps, schema_editor):
+    """Начальное заполнение сводки по существующим урокам."""
+    Lesson = apps.get_model("lessons", "Lesson")
+    LessonDailyStat = apps.get_model("lessons", "LessonDailyStat")
+    qn = schema_editor.quote_name
+    schema_editor.execute(
+        f"""
+        INSERT INTO {qn(LessonDailyStat._meta.db_table)} ("teacher_id", "day", "status", "count")
+        SELECT "teacher_id", ("start_time" AT TIME ZONE %s)::date, "status", COUNT(*)
+        FROM {qn(Lesson._meta.db_table)}
+        GROUP BY 1, 2, 3
+        """,
+        [settings.TIME_ZONE],
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("lessons", "0005_lesson_no_overlap"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="LessonDailyStat",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("day", models.DateField(verbose_name="День")),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("draft", "Черновик"),
+                            ("scheduled", "Запланирован"),
+                            ("in_progress", "В процессе"),
+                            ("completed", "Завершен"),
+                            ("cancelled", "Отменен"),
+                        ],
+                        max_length=20,
+                        verbose_name="Статус урока",
+                    ),
+                ),
+                ("count", models.IntegerField(default=0, verbose_name="Число уроков")),
+                (
+                    "teacher",
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="lesson_daily_stats",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Преподаватель",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Статистика уроков за день",
+                "verbose_name_plural": "Статистика уроков по дням",
+                "ordering": ["day", "teacher", "status"],
+                "indexes": [
+                    models.Index(
+                        fields=["day", "status"], name="lesson_stat_day_status"
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("teacher", "day", "status"),
+                        name="lesson_stat_teacher_day_status",
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(fill_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.9 on 2026-10-18 20:32
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("lessons", "0006_lesson_daily_stats"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="lesson",
+            index=models.Index(
+                condition=models.Q(("status", "scheduled")),
+                fields=["start_time"],
+                name="lesson_scheduled_start",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="lesson",
+            index=models.Index(
+                condition=models.Q(("status", "in_progress")),
+                fields=["end_time"],
+                name="lesson_in_progress_end",
+            ),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.9 on 2026-10-18 20:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("lessons", "0007_lesson_active_partial_indexes"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="lessonevent",
+            name="kind",
+            field=models.CharField(
+                choices=[
+                    ("lesson_created", "Урок создан"),
+                    ("lesson_started", "Урок начат"),
+                    ("lesson_completed", "Урок завершен"),
+                    ("lesson_cancelled", "Урок отменен"),
+                    ("lesson_reminder", "Напоминание об уроке"),
+                ],
+                max_length=32,
+                verbose_name="Тип события",
+            ),
+        ),
+    ]
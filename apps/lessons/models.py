@@ -1,8 +1,14 @@
 import logging
+from typing import NamedTuple
 
 from django.contrib.auth import get_user_model
-from django.core.exceptions import ValidationError
-from django.db import models
+from django.contrib.postgres.constraints import ExclusionConstraint
+from django.contrib.postgres.fields import DateTimeRangeField, RangeOperators
+from django.core.exceptions import EmptyResultSet, ValidationError
+from django.db import IntegrityError, connections, models, router, transaction
+from django.db.models import sql
+from django.db.models.signals import post_save
+from django.dispatch import Signal
 from django.utils import timezone
 
 User = get_user_model()
@@ -17,7 +23,226 @@ class LessonStatus(models.TextChoices):
     CANCELLED = "cancelled", "Отменен"
 
 
+class LessonEventKind(models.TextChoices):
+    CREATED = "lesson_created", "Урок создан"
+    STARTED = "lesson_started", "Урок начат"
+    COMPLETED = "lesson_completed", "Урок завершен"
+    CANCELLED = "lesson_cancelled", "Урок отменен"
+    REMINDER = "lesson_reminder", "Напоминание об уроке"
+
+
+class Transition(NamedTuple):
+    sources: tuple
+    target: str
+
+
+# Разрешенные переходы статусов: действие -> (из каких статусов, в какой).
+LESSON_TRANSITIONS = {
+    "start": Transition(
+        sources=(LessonStatus.DRAFT, LessonStatus.SCHEDULED),
+        target=LessonStatus.IN_PROGRESS,
+    ),
+    "complete": Transition(
+        sources=(LessonStatus.IN_PROGRESS,),
+        target=LessonStatus.COMPLETED,
+    ),
+    "cancel": Transition(
+        sources=(LessonStatus.DRAFT, LessonStatus.SCHEDULED, LessonStatus.IN_PROGRESS),
+        target=LessonStatus.CANCELLED,
+    ),
+}
+
+
+# Переходы, которые выполняются автоматически, когда наступает время урока:
+# действие -> (статус, поле времени).
+LESSON_AUTO_TRANSITIONS = {
+    "start": (LessonStatus.SCHEDULED, "start_time"),
+    "complete": (LessonStatus.IN_PROGRESS, "end_time"),
+}
+
+
+class TransitionResult(NamedTuple):
+    id: int
+    # Статус урока до выполнения запроса.
+    previous_status: str
+    # Урок после перехода или None, если переход из текущего статуса запрещен.
+    lesson: "Lesson | None"
+
+    @property
+    def applied(self):
+        return self.lesson is not None
+
+
+# Сигнал массового перехода статуса (bulk_transition): post_save для каждого
+# урока не отправляется, обработчики получают все измененные уроки разом.
+lessons_transitioned = Signal()
+
+
+class LessonQuerySet(models.QuerySet):
+    def transition(self, pk, action):
+        """
+        Атомарно переводит урок в новый статус одним запросом.
+
+        Строка блокируется (FOR UPDATE) и обновляется только если ее текущий
+        статус разрешен таблицей LESSON_TRANSITIONS, поэтому конкурирующие
+        запросы не могут выполнить один переход дважды. Без full_clean и
+        предварительного SELECT. Урок ищется в пределах queryset (фильтры
+        ViewSet), бросает Lesson.DoesNotExist, если его там нет.
+        """
+        # Как в QuerySet.update(): self.db - база для записи (роутер), не реплика.
+        self._for_write = True
+        subquery = self.filter(pk=pk)._id_subquery()
+        if subquery is None:
+            raise self.model.DoesNotExist(f"Lesson {pk} does not exist")
+        sql, params = subquery
+        with transaction.atomic(using=self.db):
+            results = self._execute_transition(action, f"id IN ({sql})", params)
+            if not results:
+                raise self.model.DoesNotExist(f"Lesson {pk} does not exist")
+
+            result = results[0]
+            if result.applied:
+                post_save.send(
+                    sender=self.model,
+                    instance=result.lesson,
+                    created=False,
+                    update_fields=frozenset({"status", "updated_at"}),
+                    raw=False,
+                    using=self.db,
+                )
+        if result.applied:
+            result.lesson._snapshot()
+        return result
+
+    def bulk_transition(self, action):
+        """
+        Переводит все уроки queryset в новый статус одним UPDATE.
+
+        Возвращает TransitionResult по каждому найденному уроку (по возрастанию
+        id), чтобы частичные отказы были видны. Вместо post_save отправляется
+        один сигнал lessons_transitioned со всеми измененными уроками.
+        """
+        self._for_write = True
+        subquery = self._id_subquery()
+        if subquery is None:
+            return []
+        sql, params = subquery
+        with transaction.atomic(using=self.db):
+            results = self._execute_transition(action, f"id IN ({sql})", params)
+
+            lessons = [result.lesson for result in results if result.applied]
+            if lessons:
+                lessons_transitioned.send(
+                    sender=self.model,
+                    action=action,
+                    lessons=lessons,
+                    using=self.db,
+                )
+        for lesson in lessons:
+            lesson._snapshot()
+        return results
+
+    def due(self, action, now=None):
+        """Уроки, для которых наступило время автоматического перехода, по порядку времени."""
+        lesson_status, field = LESSON_AUTO_TRANSITIONS[action]
+        return self.filter(
+            status=lesson_status, **{f"{field}__lte": now or timezone.now()}
+        ).order_by(field)
+
+    def _id_subquery(self):
+        """SQL и параметры id уроков queryset; None, если queryset заведомо пуст (none())."""
+        queryset = self if self.query.is_sliced else self.order_by()
+        try:
+            return queryset.values("id").query.sql_with_params()
+        except EmptyResultSet:
+            return None
+
+    def _execute_transition(self, action, where, params):
+        transition = LESSON_TRANSITIONS[action]
+        model = self.model
+        fields = model._meta.concrete_fields
+        connection = connections[self.db]
+        qn = connection.ops.quote_name
+        table = qn(model._meta.db_table)
+        returning = ", ".join(f"{table}.{qn(f.column)}" for f in fields)
+
+        # Строки блокируются по возрастанию id, чтобы массовые переходы
+        # не взаимоблокировались друг с другом.
+        sql = f"""
+            WITH current AS (
+                SELECT id, status FROM {table} WHERE {where} ORDER BY id FOR UPDATE
+            ), updated AS (
+                UPDATE {table} SET status = %s, updated_at = %s
+                FROM current
+                WHERE {table}.id = current.id AND current.status = ANY(%s)
+                RETURNING {returning}
+            )
+            SELECT current.id, current.status, updated.*
+            FROM current LEFT JOIN updated ON updated.id = current.id
+            ORDER BY current.id
+        """
+        params = [
+            *params,
+            transition.target,
+            timezone.now(),
+            list(transition.sources),
+        ]
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            rows = cursor.fetchall()
+
+        attnames = [f.attname for f in fields]
+        results = []
+        for pk, previous_status, *values in rows:
+            lesson = None
+            if values[0] is not None:
+                lesson = model.from_db(self.db, attnames, values)
+                # Статус до перехода, чтобы обработчики увидели изменение.
+                lesson._loaded_values["status"] = previous_status
+            results.append(
+                TransitionResult(id=pk, previous_status=previous_status, lesson=lesson)
+            )
+        return results
+
+
+class TsTzRange(models.Func):
+    """Полуоткрытый интервал [start, end): уроки встык не пересекаются."""
+
+    function = "TSTZRANGE"
+    output_field = DateTimeRangeField()
+
+
+# Ограничения на пересечение расписания: поле, которое получит ошибку, и текст.
+OVERLAP_CONSTRAINTS = {
+    "lesson_teacher_no_overlap": (
+        "teacher",
+        "У преподавателя уже есть урок в это время.",
+    ),
+    "lesson_student_no_overlap": (
+        "student",
+        "У студента уже есть урок в это время.",
+    ),
+}
+
+
+def overlap_constraint(name):
+    field, message = OVERLAP_CONSTRAINTS[name]
+    return ExclusionConstraint(
+        name=name,
+        expressions=[
+            (field, RangeOperators.EQUAL),
+            (TsTzRange("start_time", "end_time"), RangeOperators.OVERLAPS),
+        ],
+        condition=~models.Q(status=LessonStatus.CANCELLED),
+        violation_error_message=message,
+    )
+
+
 class Lesson(models.Model):
+    # Поля, значения которых запоминаются при загрузке из БД и возвращаются
+    # тем же UPDATE при save(), чтобы узнать, что изменилось при сохранении.
+    TRACKED_FIELDS = ("status", "teacher", "student", "start_time", "end_time")
+
     title = models.CharField(max_length=200, verbose_name="Название урока")
     description = models.TextField(verbose_name="Описание", blank=True)
     teacher = models.ForeignKey(
@@ -43,18 +268,54 @@ class Lesson(models.Model):
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Дата создания")
     updated_at = models.DateTimeField(auto_now=True, verbose_name="Дата обновления")
 
+    objects = LessonQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Урок"
         verbose_name_plural = "Уроки"
-        ordering = ["-start_time"]
-        # indexes на данный момент избыточны
+        ordering = ["-start_time", "-id"]
+        indexes = [
+            models.Index(
+                fields=["teacher", "status", "-start_time"],
+                name="lesson_teacher_status_start",
+            ),
+            models.Index(
+                fields=["student", "status", "-start_time"],
+                name="lesson_student_status_start",
+            ),
+            models.Index(
+                fields=["status", "-start_time"],
+                name="lesson_status_start",
+            ),
+            models.Index(fields=["-start_time", "-id"], name="lesson_start_id"),
+            # Частичные индексы только по активным урокам для автоматических
+            # переходов: размер не зависит от числа завершенных уроков.
+            models.Index(
+                fields=["start_time"],
+                condition=models.Q(status=LessonStatus.SCHEDULED),
+                name="lesson_scheduled_start",
+            ),
+            models.Index(
+                fields=["end_time"],
+                condition=models.Q(status=LessonStatus.IN_PROGRESS),
+                name="lesson_in_progress_end",
+            ),
+        ]
         constraints = [
             models.CheckConstraint(
                 check=models.Q(end_time__gt=models.F("start_time")),
                 name="lesson_end_after_start",
-            )
+            ),
+            # GiST-индексы (btree_gist): проверка пересечения за O(log n),
+            # отмененные уроки время не занимают.
+            *(overlap_constraint(name) for name in OVERLAP_CONSTRAINTS),
         ]
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._loaded_values = {}
+        self._snapshot()
+
     def __str__(self):
         return f"{self.title} - {self.get_status_display()} ({self.start_time:%d.%m.%Y %H:%M})"
 
@@ -77,8 +338,96 @@ class Lesson(models.Model):
 
     def save(self, *args, **kwargs):
         """Переопределяем save для автоматической валидации."""
-        self.full_clean()
-        super().save(*args, **kwargs)
+        # Ограничения проверяет сама БД при записи, без отдельных SELECT.
+        self.full_clean(validate_constraints=False)
+        # post_save пишет события в outbox: в той же транзакции, что и урок.
+        using = kwargs.get("using") or router.db_for_write(type(self), instance=self)
+        try:
+            with transaction.atomic(using=using):
+                super().save(*args, **kwargs)
+        except IntegrityError as exc:
+            constraint = getattr(
+                getattr(exc.__cause__, "diag", None), "constraint_name", None
+            )
+            if constraint not in OVERLAP_CONSTRAINTS:
+                raise
+            field, message = OVERLAP_CONSTRAINTS[constraint]
+            raise ValidationError({field: message}, code="overlap") from exc
+        # post_save уже отработал и видел старые значения, теперь сохранённые
+        # значения становятся исходными.
+        self._snapshot()
+
+    def _do_update(self, base_qs, using, pk_val, values, update_fields, forced_update):
+        """
+        UPDATE урока, который одним запросом возвращает и исходные значения
+        отслеживаемых полей из БД. Строка блокируется (FOR UPDATE) в том же
+        запросе, поэтому post_save сравнивает с тем, что было в БД, а не со
+        снимком экземпляра: тот мог устареть (параллельное сохранение) или не
+        содержать полей, отложенных через only()/defer().
+        """
+        if not values:
+            return super()._do_update(
+                base_qs, using, pk_val, values, update_fields, forced_update
+            )
+
+        query = sql.UpdateQuery(type(self))
+        query.add_update_fields(values)
+        update_sql, update_params = query.get_compiler(using).as_sql()
+
+        connection = connections[using]
+        qn = connection.ops.quote_name
+        table = qn(self._meta.db_table)
+        pk = qn(self._meta.pk.column)
+        columns = [
+            qn(self._meta.get_field(name).column) for name in self.TRACKED_FIELDS
+        ]
+        sql_text = f"""
+            WITH previous AS (
+                SELECT {pk}, {", ".join(columns)} FROM {table}
+                WHERE {pk} = %s FOR UPDATE
+            )
+            {update_sql}
+            FROM previous
+            WHERE {table}.{pk} = previous.{pk}
+            RETURNING {", ".join(f"previous.{column}" for column in columns)}
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(sql_text, [pk_val, *update_params])
+            row = cursor.fetchone()
+        if row is None:
+            return False
+        self._loaded_values.update(zip(self.TRACKED_FIELDS, row))
+        return True
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+        self._snapshot(fields)
+
+    def _snapshot(self, fields=None):
+        """Запоминает текущие значения отслеживаемых полей."""
+        for name in self.TRACKED_FIELDS:
+            attname = self._meta.get_field(name).attname
+            if fields is not None and name not in fields and attname not in fields:
+                continue
+            # Отложенные (deferred) поля не читаем, чтобы не вызвать запрос.
+            if attname in self.__dict__:
+                self._loaded_values[name] = self.__dict__[attname]
+
+    def get_previous_value(self, name):
+        """Значение поля на момент загрузки из БД (или последнего save)."""
+        return self._loaded_values.get(name)
+
+    def has_changed(self, name):
+        """Изменилось ли поле с момента загрузки; незагруженные поля не изменены."""
+        if name not in self._loaded_values:
+            return False
+        attname = self._meta.get_field(name).attname
+        return self.__dict__.get(attname) != self._loaded_values[name]
+
+    @property
+    def changed_fields(self):
+        """Список изменённых отслеживаемых полей."""
+        return [name for name in self.TRACKED_FIELDS if self.has_changed(name)]
 
     @property
     def is_active(self):
@@ -89,26 +438,93 @@ class Lesson(models.Model):
             and self.status == LessonStatus.IN_PROGRESS
         )
 
+    def transition(self, action):
+        """Выполняет переход статуса и обновляет экземпляр; True, если переход выполнен."""
+        # Урок, прочитанный с реплики, переводится в базе для записи.
+        using = router.db_for_write(type(self), instance=self)
+        result = type(self).objects.db_manager(using).transition(self.pk, action)
+        if result.lesson is None:
+            self.status = result.previous_status
+            self._snapshot(["status"])
+            return False
+        self.status = result.lesson.status
+        self.updated_at = result.lesson.updated_at
+        self._snapshot(["status"])
+        return True
+
     def start_lesson(self):
         """Начинает урок."""
-        if self.status == [LessonStatus.DRAFT, LessonStatus.SCHEDULED]:
-            self.status = LessonStatus.IN_PROGRESS
-            self.save(update_fields=["status", "updated_at"])
-            return True
-        return False
+        return self.transition("start")
 
     def complete_lesson(self):
         """Завершает урок."""
-        if self.status in [LessonStatus.IN_PROGRESS]:
-            self.status = LessonStatus.COMPLETED
-            self.save(update_fields=["status", "updated_at"])
-            return True
-        return False
+        return self.transition("complete")
 
     def cancel_lesson(self):
         """Отменяет урок."""
-        if self.status in [LessonStatus.DRAFT, LessonStatus.SCHEDULED, LessonStatus.IN_PROGRESS]:
-            self.status = LessonStatus.CANCELLED
-            self.save(update_fields=["status", "updated_at"])
-            return True
-        return False
+        return self.transition("cancel")
+
+
+class LessonEvent(models.Model):
+    """
+    Событие по уроку в transactional outbox.
+
+    Пишется в той же транзакции, что и изменение урока, поэтому события
+    откаченных транзакций не публикуются. Команда relay_outbox доставляет
+    события пачками в порядке id и удаляет доставленные.
+    """
+
+    lesson_id = models.BigIntegerField(verbose_name="ID урока")
+    kind = models.CharField(
+        max_length=32, choices=LessonEventKind.choices, verbose_name="Тип события"
+    )
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Дата создания")
+
+    class Meta:
+        verbose_name = "Событие урока"
+        verbose_name_plural = "События уроков"
+        ordering = ["id"]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} ({self.lesson_id})"
+
+
+class LessonDailyStat(models.Model):
+    """
+    Число уроков преподавателя за день (по TIME_ZONE) в каждом статусе.
+
+    Поддерживается приращениями в тех же транзакциях, что и изменения уроков
+    (см. stats.py и signals.py). QuerySet.update() и bulk_create() сигналов не
+    отправляют: после них нужна команда rebuild_lesson_stats.
+    """
+
+    teacher = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="lesson_daily_stats",
+        verbose_name="Преподаватель",
+        # Поиск по преподавателю идет по уникальному индексу (teacher, day, status).
+        db_index=False,
+    )
+    day = models.DateField(verbose_name="День")
+    status = models.CharField(
+        max_length=20, choices=LessonStatus.choices, verbose_name="Статус урока"
+    )
+    count = models.IntegerField(default=0, verbose_name="Число уроков")
+
+    class Meta:
+        verbose_name = "Статистика уроков за день"
+        verbose_name_plural = "Статистика уроков по дням"
+        ordering = ["day", "teacher", "status"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["teacher", "day", "status"],
+                name="lesson_stat_teacher_day_status",
+            )
+        ]
+        indexes = [
+            models.Index(fields=["day", "status"], name="lesson_stat_day_status")
+        ]
+
+    def __str__(self):
+        return f"{self.teacher_id} {self.day:%d.%m.%Y} {self.get_status_display()}: {self.count}"
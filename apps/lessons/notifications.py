@@ -0,0 +1,161 @@
+"""
+Доставка уведомлений по урокам.
+
+Уведомления группируются по получателю в пачки, пачки отправляются
+конкурентно в одном event loop: ожидание ответа внешнего сервиса (SMTP,
+SMS-шлюз) не блокирует воркер, пока в полете остальные пачки.
+"""
+
+import asyncio
+import logging
+import time
+from collections import defaultdict
+from typing import NamedTuple
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from .models import LessonEventKind, LessonStatus
+
+logger = logging.getLogger("lessons")
+
+LESSON_CREATED = LessonEventKind.CREATED
+LESSON_STARTED = LessonEventKind.STARTED
+LESSON_COMPLETED = LessonEventKind.COMPLETED
+LESSON_CANCELLED = LessonEventKind.CANCELLED
+LESSON_REMINDER = LessonEventKind.REMINDER
+
+# Тип уведомления, которое отправляется при переходе в статус.
+STATUS_NOTIFICATION_KINDS = {
+    LessonStatus.IN_PROGRESS: LESSON_STARTED,
+    LessonStatus.COMPLETED: LESSON_COMPLETED,
+    LessonStatus.CANCELLED: LESSON_CANCELLED,
+}
+
+MESSAGES = {
+    LESSON_CREATED: "Урок создан: '{title}' {id}, для студента {student_id}",
+    LESSON_STARTED: "Урок начался: '{title}'",
+    LESSON_COMPLETED: "Урок завершен: '{title}'",
+    LESSON_CANCELLED: "Урок отменен: '{title}'",
+    LESSON_REMINDER: "Скоро начнется урок: '{title}'",
+}
+
+DEFAULTS = {
+    "TRANSPORT": "apps.lessons.notifications.LoggingTransport",
+    "OPTIONS": {},
+    "CONCURRENCY": 100,
+    "BATCH_SIZE": 50,
+}
+
+
+class Notification(NamedTuple):
+    kind: str
+    lesson_id: int
+    recipient_id: int
+    message: str
+
+
+def build_notification(kind, lesson):
+    message = MESSAGES[kind].format(
+        id=lesson.id, title=lesson.title, student_id=lesson.student_id
+    )
+    return Notification(kind, lesson.id, lesson.student_id, message)
+
+
+class BaseTransport:
+    """Транспорт доставки: отправляет пачку уведомлений одному получателю."""
+
+    async def send_batch(self, recipient_id, notifications):
+        raise NotImplementedError
+
+
+class LoggingTransport(BaseTransport):
+    """Имитация внешнего сервиса: задержка на пачку и запись в лог."""
+
+    def __init__(self, latency=5):
+        self.latency = latency
+
+    async def send_batch(self, recipient_id, notifications):
+        await asyncio.sleep(self.latency)
+        for notification in notifications:
+            logger.info(
+                f"[CELERY] Уведомление по уроку {notification.lesson_id} для студента "
+                f"{recipient_id} успешно отправлено: {notification.message}"
+            )
+
+
+class FakeTransport(BaseTransport):
+    """Локальный транспорт для тестов: запоминает пачки, может имитировать сбои."""
+
+    def __init__(self, latency=0, failing_recipients=()):
+        self.latency = latency
+        self.failing_recipients = set(failing_recipients)
+        self.sent = []
+
+    async def send_batch(self, recipient_id, notifications):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if recipient_id in self.failing_recipients:
+            raise ConnectionError(f"Получатель {recipient_id} недоступен")
+        self.sent.append((recipient_id, list(notifications)))
+
+
+class DeliveryReport(NamedTuple):
+    sent: list
+    failed: list
+    elapsed: float
+
+    @property
+    def rate(self):
+        """Уведомлений в секунду."""
+        return len(self.sent) / self.elapsed if self.elapsed else 0.0
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, "LESSON_NOTIFICATIONS", {})}
+
+
+def get_transport():
+    config = get_config()
+    return import_string(config["TRANSPORT"])(**config["OPTIONS"])
+
+
+def deliver(notifications, transport=None, concurrency=None, batch_size=None):
+    """Синхронная обертка для Celery-задач."""
+    return asyncio.run(adeliver(notifications, transport, concurrency, batch_size))
+
+
+async def adeliver(notifications, transport=None, concurrency=None, batch_size=None):
+    """Доставляет уведомления пачками по получателям, не более concurrency пачек в полете."""
+    config = get_config()
+    transport = transport or get_transport()
+    semaphore = asyncio.Semaphore(concurrency or config["CONCURRENCY"])
+    batch_size = batch_size or config["BATCH_SIZE"]
+
+    by_recipient = defaultdict(list)
+    for notification in notifications:
+        by_recipient[notification.recipient_id].append(notification)
+
+    async def send(recipient_id, batch):
+        async with semaphore:
+            try:
+                await transport.send_batch(recipient_id, batch)
+            except Exception as exc:
+                logger.error(f"Ошибка доставки получателю {recipient_id}: {exc}")
+                return batch, False
+            return batch, True
+
+    started = time.monotonic()
+    results = await asyncio.gather(
+        *(
+            send(recipient_id, pending[i : i + batch_size])
+            for recipient_id, pending in by_recipient.items()
+            for i in range(0, len(pending), batch_size)
+        )
+    )
+    elapsed = time.monotonic() - started
+
+    sent, failed = [], []
+    for batch, ok in results:
+        (sent if ok else failed).extend(batch)
+    return DeliveryReport(sent=sent, failed=failed, elapsed=elapsed)
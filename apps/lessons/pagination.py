@@ -0,0 +1,140 @@
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import Cursor, CursorPagination, _reverse_ordering
+
+
+class LessonCursorPagination(CursorPagination):
+    """
+    Keyset-пагинация списка уроков по (-start_time, -id).
+
+    Позиция курсора хранит оба поля сортировки, поэтому следующая страница
+    выбирается условием (start_time, id) < (позиция) по индексу без OFFSET
+    и COUNT(*): глубокие страницы стоят столько же, сколько первая.
+    """
+
+    page_size = 20
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    ordering = ("-start_time", "-id")
+    position_separator = "|"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        queryset = self.get_page_queryset(queryset, request, view)
+        if queryset is None:
+            return None
+        return self.set_page(list(queryset))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """То же, что paginate_queryset, но страница читается асинхронным ORM."""
+        queryset = self.get_page_queryset(queryset, request, view)
+        if queryset is None:
+            return None
+        return self.set_page([row async for row in queryset])
+
+    def get_page_queryset(self, queryset, request, view=None):
+        """Запрос страницы (на одну запись больше размера), без обращения к БД."""
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            self.reverse, self.current_position = False, None
+        else:
+            self.reverse, self.current_position = (
+                self.cursor.reverse,
+                self.cursor.position,
+            )
+
+        if self.reverse:
+            queryset = queryset.order_by(*_reverse_ordering(self.ordering))
+        else:
+            queryset = queryset.order_by(*self.ordering)
+
+        if self.current_position is not None:
+            queryset = queryset.filter(
+                self.get_keyset_filter(self.current_position, self.reverse)
+            )
+
+        return queryset[: self.page_size + 1]
+
+    def set_page(self, results):
+        """Страница и позиции ссылок по результату запроса get_page_queryset."""
+        reverse, current_position = self.reverse, self.current_position
+        self.page = results[: self.page_size]
+        has_more = len(results) > len(self.page)
+        if reverse:
+            self.page = list(reversed(self.page))
+            self.has_next = current_position is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = current_position is not None
+
+        # Ссылки указывают на крайние уроки страницы: следующая страница
+        # начинается строго после последнего, предыдущая — строго перед первым.
+        if self.page:
+            self.previous_position = self._get_position_from_instance(
+                self.page[0], self.ordering
+            )
+            self.next_position = self._get_position_from_instance(
+                self.page[-1], self.ordering
+            )
+        else:
+            self.previous_position = self.next_position = current_position
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+
+        return self.page
+
+    def get_keyset_filter(self, position, reverse):
+        """
+        Условие «строго после позиции» для сортировки (-start_time, -id).
+
+        start_time__lte даёт границу диапазона по индексу, а вторая часть
+        отсекает уже отданные уроки с тем же start_time.
+        """
+        start_time, pk = self.parse_position(position)
+        if reverse:
+            return Q(start_time__gte=start_time) & (
+                Q(start_time__gt=start_time) | Q(id__gt=pk)
+            )
+        return Q(start_time__lte=start_time) & (
+            Q(start_time__lt=start_time) | Q(id__lt=pk)
+        )
+
+    def parse_position(self, position):
+        start_time, _, pk = position.rpartition(self.position_separator)
+        try:
+            start_time = parse_datetime(start_time)
+        except ValueError:
+            start_time = None
+        if start_time is None or not pk.isdigit():
+            raise NotFound(self.invalid_cursor_message)
+        return start_time, int(pk)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return self.encode_cursor(self._cursor(self.next_position, reverse=False))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        return self.encode_cursor(self._cursor(self.previous_position, reverse=True))
+
+    def _cursor(self, position, reverse):
+        return Cursor(offset=0, reverse=reverse, position=position)
+
+    def _get_position_from_instance(self, instance, ordering):
+        if isinstance(instance, dict):
+            start_time, pk = instance["start_time"], instance["id"]
+        else:
+            start_time, pk = instance.start_time, instance.pk
+        return f"{start_time.isoformat()}{self.position_separator}{pk}"
@@ -0,0 +1,128 @@
+"""
+Напоминания о предстоящих уроках.
+
+Время напоминания (start_time - LEAD_MINUTES) каждого запланированного урока
+хранится в sorted set Redis: перенос урока - ZADD с новым весом за O(log n),
+отмена или начало - ZREM. Поэтому нет отложенных ETA-задач в памяти
+воркеров и устаревших напоминаний. Один процесс run_reminder_poller забирает
+наступившие напоминания пачками и ставит задачу пакетной доставки.
+"""
+
+import logging
+
+from django.conf import settings
+from django.utils import timezone
+from django_redis import get_redis_connection
+
+from .models import Lesson, LessonEventKind, LessonStatus
+from .tasks import deliver_lesson_notifications
+
+logger = logging.getLogger("lessons")
+
+REMINDERS_KEY = "lessons:reminders"
+
+DEFAULTS = {
+    "LEAD_MINUTES": 15,
+    "BATCH_SIZE": 500,
+}
+
+# Атомарно забирает до ARGV[2] напоминаний с временем не позже ARGV[1].
+POP_DUE_SCRIPT = """
+local due = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'WITHSCORES', 'LIMIT', 0, ARGV[2])
+for i = 1, #due, 2 do
+    redis.call('ZREM', KEYS[1], due[i])
+end
+return due
+"""
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, "LESSON_REMINDERS", {})}
+
+
+def get_client():
+    return get_redis_connection("default")
+
+
+def remind_at(lesson):
+    """Время напоминания (timestamp) или None, если напоминание не нужно."""
+    if lesson.status != LessonStatus.SCHEDULED or lesson.start_time <= timezone.now():
+        return None
+    return lesson.start_time.timestamp() - get_config()["LEAD_MINUTES"] * 60
+
+
+def sync_reminders(lessons):
+    """Ставит, переносит или снимает напоминания уроков одним обращением к Redis."""
+    schedule, remove = {}, []
+    for lesson in lessons:
+        score = remind_at(lesson)
+        if score is None:
+            remove.append(lesson.id)
+        else:
+            schedule[lesson.id] = score
+
+    pipeline = get_client().pipeline(transaction=False)
+    if schedule:
+        pipeline.zadd(REMINDERS_KEY, schedule)
+    if remove:
+        pipeline.zrem(REMINDERS_KEY, *remove)
+    pipeline.execute()
+
+
+def remove_reminders(lesson_ids):
+    if lesson_ids:
+        get_client().zrem(REMINDERS_KEY, *lesson_ids)
+
+
+def rebuild_reminders(chunk_size=2000):
+    """Заполняет sorted set заново по запланированным урокам из БД."""
+    client = get_client()
+    client.delete(REMINDERS_KEY)
+    lessons = Lesson.objects.filter(
+        status=LessonStatus.SCHEDULED, start_time__gt=timezone.now()
+    ).only("id", "status", "start_time")
+
+    total, batch = 0, []
+    for lesson in lessons.iterator(chunk_size=chunk_size):
+        batch.append(lesson)
+        if len(batch) == chunk_size:
+            sync_reminders(batch)
+            total, batch = total + len(batch), []
+    if batch:
+        sync_reminders(batch)
+        total += len(batch)
+    return total
+
+
+def pop_due(batch_size, now=None):
+    """Забирает наступившие напоминания: {lesson_id: время напоминания}."""
+    now = (now or timezone.now()).timestamp()
+    due = get_client().eval(POP_DUE_SCRIPT, 1, REMINDERS_KEY, now, batch_size)
+    return {int(due[i]): float(due[i + 1]) for i in range(0, len(due), 2)}
+
+
+def dispatch_due(batch_size=None):
+    """
+    Отправляет одну пачку наступивших напоминаний, возвращает их число.
+
+    Если задачу не удалось поставить в очередь, напоминания возвращаются
+    в sorted set и будут отправлены следующим опросом.
+    """
+    due = pop_due(batch_size or get_config()["BATCH_SIZE"])
+    if not due:
+        return 0
+
+    # Sorted set обновляется после коммита изменений, поэтому урок мог успеть
+    # измениться: напоминаем только о тех, что все еще запланированы.
+    lesson_ids = list(
+        Lesson.objects.filter(
+            id__in=list(due), status=LessonStatus.SCHEDULED
+        ).values_list("id", flat=True)
+    )
+    if lesson_ids:
+        try:
+            deliver_lesson_notifications.delay(LessonEventKind.REMINDER, lesson_ids)
+        except Exception:
+            get_client().zadd(REMINDERS_KEY, {pk: due[pk] for pk in lesson_ids})
+            raise
+    return len(due)
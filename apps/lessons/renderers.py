@@ -0,0 +1,75 @@
+"""
+Рендереры потоковой выгрузки уроков (GET /lessons/export/).
+
+stream() отдает байты пачками по мере чтения строк из курсора, поэтому
+ответ начинает уходить клиенту сразу, а память не зависит от размера выгрузки.
+render() используется DRF для небольших ответов, например ошибок валидации.
+"""
+
+import csv
+import io
+import json
+from itertools import islice
+
+from rest_framework.renderers import BaseRenderer
+
+STREAM_BATCH_SIZE = 1000
+
+
+def batched(rows, size):
+    """Строки пачками по size (itertools.batched есть только с Python 3.12)."""
+    iterator = iter(rows)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+class NDJSONRenderer(BaseRenderer):
+    """Одна строка JSON на урок."""
+
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        rows = data if isinstance(data, list) else [data]
+        return b"".join(self.stream(rows))
+
+    def stream(self, rows, fields=None):
+        for batch in batched(rows, STREAM_BATCH_SIZE):
+            yield "".join(
+                json.dumps(row, ensure_ascii=False, separators=(",", ":")) + "\n"
+                for row in batch
+            ).encode(self.charset)
+
+
+class CSVRenderer(BaseRenderer):
+    """CSV с заголовком из имен полей."""
+
+    media_type = "text/csv"
+    format = "csv"
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, dict):
+            # Ошибка валидации: пары поле - сообщение.
+            data = [
+                {
+                    "field": key,
+                    "error": " ".join(value) if isinstance(value, list) else value,
+                }
+                for key, value in data.items()
+            ]
+        fields = list(data[0]) if data else []
+        return b"".join(self.stream(data, fields))
+
+    def stream(self, rows, fields=None):
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=fields)
+        writer.writeheader()
+        for batch in batched(rows, STREAM_BATCH_SIZE):
+            writer.writerows(batch)
+            yield buffer.getvalue().encode(self.charset)
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue().encode(self.charset)
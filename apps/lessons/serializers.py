@@ -1,6 +1,10 @@
+from datetime import timedelta
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.utils import timezone
 from rest_framework import serializers
 
-from .models import Lesson, User
+from .models import Lesson, LessonStatus, User
 
 
 class LessonSerializer(serializers.ModelSerializer):
@@ -27,10 +31,18 @@ class LessonSerializer(serializers.ModelSerializer):
         """Для совместимости с Swagger"""
         return f"LessonSerializer for {self.Meta.model.__name__}"
 
-    def to_representation(self, instance: Lesson):
-        """Преобразование для JSON"""
-        data = super().to_representation(instance)
-        return data
+    def create(self, validated_data):
+        # Ошибки модели (в том числе пересечение расписания, найденное БД) - 400.
+        try:
+            return super().create(validated_data)
+        except DjangoValidationError as exc:
+            raise serializers.ValidationError(serializers.as_serializer_error(exc))
+
+    def update(self, instance, validated_data):
+        try:
+            return super().update(instance, validated_data)
+        except DjangoValidationError as exc:
+            raise serializers.ValidationError(serializers.as_serializer_error(exc))
 
     def validate(self, data):
         if "start_time" in data and "end_time" in data:
@@ -45,3 +57,154 @@ class LessonSerializer(serializers.ModelSerializer):
             )
 
         return data
+
+
+class LessonRowSerializer:
+    """
+    Быстрая сериализация уроков только для чтения (списки и выгрузки).
+
+    Читает только нужные колонки через values() и формирует те же данные,
+    что и LessonSerializer, без создания моделей и полей DRF.
+    """
+
+    columns = (
+        "id",
+        "title",
+        "teacher_id",
+        "student_id",
+        "start_time",
+        "end_time",
+        "status",
+        "created_at",
+    )
+    fields = (
+        "id",
+        "title",
+        "teacher",
+        "student",
+        "start_time",
+        "end_time",
+        "status",
+        "created_at",
+    )
+
+    def __init__(self):
+        self.tz = timezone.get_current_timezone()
+
+    @classmethod
+    def values(cls, queryset, *extra):
+        """Строки с колонками сериализатора и дополнительными extra."""
+        return queryset.values(*cls.columns, *extra)
+
+    def format_datetime(self, value):
+        """Как serializers.DateTimeField: локальное время в ISO 8601, UTC как Z."""
+        value = value.astimezone(self.tz).isoformat()
+        if value.endswith("+00:00"):
+            value = value[:-6] + "Z"
+        return value
+
+    def to_representation(self, row):
+        format_datetime = self.format_datetime
+        return {
+            "id": row["id"],
+            "title": row["title"],
+            "teacher": row["teacher_id"],
+            "student": row["student_id"],
+            "start_time": format_datetime(row["start_time"]),
+            "end_time": format_datetime(row["end_time"]),
+            "status": row["status"],
+            "created_at": format_datetime(row["created_at"]),
+        }
+
+    def serialize(self, rows):
+        return [self.to_representation(row) for row in rows]
+
+
+class LessonBulkTransitionSerializer(serializers.Serializer):
+    """Тело запроса массового перехода статуса"""
+
+    MAX_IDS = 1000
+
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        required=False,
+        allow_empty=False,
+        max_length=MAX_IDS,
+        help_text="ID уроков. Если не переданы, используются фильтры role/status/upcoming",
+    )
+
+
+class FromParamMixin:
+    """Поле start принимается как параметр from (зарезервированное слово в Python)."""
+
+    def get_fields(self):
+        fields = super().get_fields()
+        fields["from"] = fields.pop("start")
+        return fields
+
+
+class AvailabilityQuerySerializer(FromParamMixin, serializers.Serializer):
+    """Параметры запроса занятости: окно [from, to), длина слота и пользователи"""
+
+    MAX_WINDOW = timedelta(days=31)
+    MAX_SLOTS = 1000
+    MAX_USERS = 100
+
+    start = serializers.DateTimeField()
+    to = serializers.DateTimeField()
+    slot = serializers.IntegerField(
+        min_value=5, max_value=24 * 60, default=60, help_text="Длина слота, мин"
+    )
+    ids = serializers.CharField(
+        required=False, help_text="Пользователи через запятую (массовый запрос)"
+    )
+
+    def validate_ids(self, value):
+        try:
+            ids = list(dict.fromkeys(int(item) for item in value.split(",") if item))
+        except ValueError:
+            raise serializers.ValidationError("Ожидается список id через запятую")
+        if not ids:
+            raise serializers.ValidationError("Список пользователей пуст")
+        if len(ids) > self.MAX_USERS:
+            raise serializers.ValidationError(
+                f"Не более {self.MAX_USERS} пользователей за запрос"
+            )
+        return ids
+
+    def validate(self, data):
+        start, end = data["from"], data["to"]
+        slot = timedelta(minutes=data["slot"])
+        if end <= start:
+            raise serializers.ValidationError({"to": "Должно быть позже from"})
+        if end - start > self.MAX_WINDOW:
+            raise serializers.ValidationError(
+                {"to": f"Окно не длиннее {self.MAX_WINDOW.days} дней"}
+            )
+        if (end - start) / slot > self.MAX_SLOTS:
+            raise serializers.ValidationError(
+                {"slot": f"Не более {self.MAX_SLOTS} слотов в окне"}
+            )
+        data["slot"] = slot
+        return data
+
+
+class LessonStatsQuerySerializer(FromParamMixin, serializers.Serializer):
+    """Параметры запроса статистики: дни [from, to], фильтры и разбивка"""
+
+    MAX_DAYS = 366
+
+    start = serializers.DateField()
+    to = serializers.DateField()
+    group_by = serializers.ChoiceField(choices=["day", "teacher"], default="day")
+    teacher = serializers.IntegerField(required=False, min_value=1)
+    status = serializers.ChoiceField(choices=LessonStatus.choices, required=False)
+
+    def validate(self, data):
+        if data["to"] < data["from"]:
+            raise serializers.ValidationError({"to": "Не может быть раньше from"})
+        if (data["to"] - data["from"]).days >= self.MAX_DAYS:
+            raise serializers.ValidationError(
+                {"to": f"Период не длиннее {self.MAX_DAYS} дней"}
+            )
+        return data
@@ -1,53 +1,88 @@
 import logging
-import time
+from collections import Counter
 
-from django.core.cache import cache
-from django.db.models.signals import post_save, pre_save
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 
-from .models import Lesson, LessonStatus
-from .tasks import (
-    send_lesson_cancelled_notification,
-    send_lesson_completed_notification,
-    send_lesson_created_notification,
-    send_lesson_started_notification,
-)
+from .availability import invalidate_users, lesson_users
+from .cache import invalidate_lessons
+from .models import Lesson, LessonEvent, LessonEventKind, lessons_transitioned
+from .notifications import STATUS_NOTIFICATION_KINDS
+from .reminders import remove_reminders, sync_reminders
+from .stats import apply_delete, apply_deltas, change_deltas
 
 logger = logging.getLogger("lessons")
 
 
-@receiver(pre_save, sender=Lesson)
-def cache_old_status_redis(sender, instance, **kwargs):
-    """Сохраняем старый статус в Redis с уникальным ключом."""
-    if instance.pk:
-        try:
-            old_lesson = Lesson.objects.get(pk=instance.pk)
-            timestamp = int(time.time() * 1000)
-            cache_key = f"lesson_old_status_{instance.pk}_{timestamp}"
-            cache.set(cache_key, old_lesson.status, timeout=10)
-            instance._cache_key = cache_key
-        except Lesson.DoesNotExist:
-            pass
+@receiver(post_save, sender=Lesson)
+def lesson_post_save(sender, instance: Lesson, created, using, update_fields, **kwargs):
+    """Обрабатываем создание урока или изменение статуса и записываем событие в outbox.
 
+    Старые значения возвращает тот же UPDATE, которым Lesson.save() пишет
+    урок, поэтому устаревший экземпляр не дает повторного события.
+    Событие пишется в той же транзакции, что и урок, и доставляется командой
+    relay_outbox.
+    """
+    logger.info(f"Lesson {instance.id} {'created' if created else 'updated'}")
+    if created:
+        kind = LessonEventKind.CREATED
+    elif instance.has_changed("status"):
+        kind = STATUS_NOTIFICATION_KINDS.get(instance.status)
+    else:
+        kind = None
 
-@receiver(post_save, sender=Lesson)
-def lesson_post_save(sender, instance: Lesson, created, **kwargs):
-    """Обрабатываем создание урока или изменение статуса и запускаем нужную celery задачу."""
-    try:
-        logger.info(f"Lesson {instance.id} {'created' if created else 'updated'}")
-        if created:
-            send_lesson_created_notification.delay(instance.id)
-        else:
-            cache_key = getattr(instance, "_cache_key", None)
-            if cache_key:
-                old_status = cache.get(cache_key)
-                cache.delete(cache_key)
-                if old_status and old_status != instance.status:
-                    if instance.status == LessonStatus.COMPLETED:
-                        send_lesson_completed_notification.delay(instance.id)
-                    elif instance.status == LessonStatus.IN_PROGRESS:
-                        send_lesson_started_notification.delay(instance.id)
-                    elif instance.status == LessonStatus.CANCELLED:
-                        send_lesson_cancelled_notification.delay(instance.id)
-    except Lesson.DoesNotExist:
-        pass
+    if kind is not None:
+        LessonEvent.objects.using(using).create(lesson_id=instance.id, kind=kind)
+
+    apply_deltas(change_deltas(instance, created, update_fields), using)
+
+    transaction.on_commit(lambda: invalidate_lessons([instance.id]), using=using)
+
+    # Занятость меняется только при изменении статуса, времени или участников.
+    if created or instance.changed_fields:
+        users = lesson_users(instance)
+        transaction.on_commit(lambda: invalidate_users(users), using=using)
+
+    if created or instance.has_changed("status") or instance.has_changed("start_time"):
+        # Ошибка Redis не должна ломать уже закоммиченное сохранение:
+        # напоминания восстанавливает run_reminder_poller --rebuild.
+        transaction.on_commit(
+            lambda: sync_reminders([instance]), using=using, robust=True
+        )
+
+
+@receiver(lessons_transitioned, sender=Lesson)
+def lessons_bulk_transitioned(sender, action, lessons, using, **kwargs):
+    """Массовый переход статуса: события всех уроков пишутся одним INSERT."""
+    logger.info(f"{len(lessons)} lessons transitioned by '{action}'")
+    events = [
+        LessonEvent(lesson_id=lesson.id, kind=STATUS_NOTIFICATION_KINDS[lesson.status])
+        for lesson in lessons
+        if lesson.status in STATUS_NOTIFICATION_KINDS
+    ]
+    LessonEvent.objects.using(using).bulk_create(events)
+    deltas = Counter()
+    for lesson in lessons:
+        deltas.update(change_deltas(lesson))
+    apply_deltas(deltas, using)
+
+    lesson_ids = [lesson.id for lesson in lessons]
+    transaction.on_commit(lambda: invalidate_lessons(lesson_ids), using=using)
+
+    users = set().union(*(lesson_users(lesson) for lesson in lessons))
+    transaction.on_commit(lambda: invalidate_users(users), using=using)
+    transaction.on_commit(lambda: sync_reminders(lessons), using=using, robust=True)
+
+
+@receiver(post_delete, sender=Lesson)
+def lesson_post_delete(sender, instance: Lesson, using, **kwargs):
+    apply_delete(instance, using)
+    # После удаления Django обнуляет pk экземпляра, id запоминаем сразу.
+    lesson_id = instance.id
+    transaction.on_commit(lambda: invalidate_lessons([lesson_id]), using=using)
+    users = lesson_users(instance)
+    transaction.on_commit(lambda: invalidate_users(users), using=using)
+    transaction.on_commit(
+        lambda: remove_reminders([lesson_id]), using=using, robust=True
+    )
@@ -0,0 +1,164 @@
+"""
+Сводная статистика уроков (LessonDailyStat): число уроков по ключу
+(преподаватель, день, статус).
+
+Каждое изменение урока превращается в приращения -1/+1 по ключам, которые
+применяются одним INSERT ... ON CONFLICT DO UPDATE в той же транзакции,
+что и изменение (см. signals.py). Откат транзакции откатывает и сводку,
+а дашборды читают только сводку, без GROUP BY по таблице уроков.
+
+Старый ключ берется из строки в БД под блокировкой (Lesson.save(),
+переходы статуса), поэтому сохранения из устаревших экземпляров не
+применяют приращение дважды. Удаление уменьшает ключ по значениям
+экземпляра на момент загрузки; удаление устаревшего экземпляра и изменения
+в обход сигналов исправляет команда rebuild_lesson_stats.
+"""
+
+from collections import Counter
+
+from django.db import connections, transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from .models import Lesson, LessonDailyStat
+
+
+def lesson_day(start_time):
+    """День урока в часовом поясе проекта (TIME_ZONE)."""
+    return timezone.localtime(start_time, timezone.get_default_timezone()).date()
+
+
+def lesson_key(lesson, update_fields=None):
+    """
+    Ключ урока после записи. Поля вне update_fields в БД не менялись, для
+    них берется исходное значение (и отложенные поля не загружаются).
+    """
+
+    def value(name, attname):
+        if update_fields is None or name in update_fields or attname in update_fields:
+            return getattr(lesson, attname)
+        return lesson.get_previous_value(name)
+
+    return (
+        value("teacher", "teacher_id"),
+        lesson_day(value("start_time", "start_time")),
+        value("status", "status"),
+    )
+
+
+def previous_key(lesson):
+    """
+    Ключ урока до записи. Lesson.save() и переходы статуса берут исходные
+    значения из БД под блокировкой строки, удаление - из снимка экземпляра.
+    """
+    teacher_id = lesson.get_previous_value("teacher") or lesson.teacher_id
+    start_time = lesson.get_previous_value("start_time") or lesson.start_time
+    status = lesson.get_previous_value("status") or lesson.status
+    return teacher_id, lesson_day(start_time), status
+
+
+def change_deltas(lesson, created=False, update_fields=None):
+    """Приращения сводки при создании или изменении урока."""
+    deltas = Counter()
+    if created:
+        deltas[lesson_key(lesson)] += 1
+        return deltas
+
+    key = lesson_key(lesson, update_fields)
+    old_key = previous_key(lesson)
+    if old_key != key:
+        deltas[old_key] -= 1
+        deltas[key] += 1
+    return deltas
+
+
+def apply_delete(lesson, using="default"):
+    """
+    Уменьшает счетчик удаленного урока.
+
+    Только UPDATE существующей строки: при каскадном удалении преподавателя
+    его строки сводки уже удалены, и вставлять новые нельзя.
+    """
+    teacher_id, day, status = previous_key(lesson)
+    LessonDailyStat.objects.using(using).filter(
+        teacher_id=teacher_id, day=day, status=status
+    ).update(count=F("count") - 1)
+
+
+def apply_deltas(deltas, using="default"):
+    """Применяет приращения одним запросом."""
+    # Один порядок строк во всех транзакциях, чтобы не было взаимных блокировок.
+    rows = sorted((key, delta) for key, delta in deltas.items() if delta)
+    if not rows:
+        return
+
+    connection = connections[using]
+    qn = connection.ops.quote_name
+    table = qn(LessonDailyStat._meta.db_table)
+    sql = f"""
+        INSERT INTO {table} ("teacher_id", "day", "status", "count")
+        VALUES {", ".join(["(%s, %s, %s, %s)"] * len(rows))}
+        ON CONFLICT ("teacher_id", "day", "status")
+        DO UPDATE SET "count" = {table}."count" + EXCLUDED."count"
+    """
+    params = [value for key, delta in rows for value in (*key, delta)]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+
+
+def rebuild_stats(using="default"):
+    """
+    Пересчитывает сводку по всей таблице уроков.
+
+    Запись уроков на время пересчета блокируется (SHARE), чтобы приращения
+    параллельных транзакций не потерялись; чтение не блокируется.
+    """
+    connection = connections[using]
+    qn = connection.ops.quote_name
+    lessons = qn(Lesson._meta.db_table)
+    stats = qn(LessonDailyStat._meta.db_table)
+    with transaction.atomic(using=using), connection.cursor() as cursor:
+        cursor.execute(f"LOCK TABLE {lessons} IN SHARE MODE")
+        cursor.execute(f"DELETE FROM {stats}")
+        cursor.execute(
+            f"""
+            INSERT INTO {stats} ("teacher_id", "day", "status", "count")
+            SELECT "teacher_id", ("start_time" AT TIME ZONE %s)::date, "status", COUNT(*)
+            FROM {lessons}
+            GROUP BY 1, 2, 3
+            """,
+            [timezone.get_default_timezone_name()],
+        )
+        return cursor.rowcount
+
+
+def get_stats(start, end, group_by="day", teacher_id=None, status=None):
+    """Число уроков за дни [start, end] по статусам, с разбивкой по дням или преподавателям."""
+    queryset = LessonDailyStat.objects.filter(day__gte=start, day__lte=end)
+    if teacher_id is not None:
+        queryset = queryset.filter(teacher_id=teacher_id)
+    if status:
+        queryset = queryset.filter(status=status)
+
+    field = "day" if group_by == "day" else "teacher_id"
+    rows = (
+        queryset.values_list(field, "status")
+        .annotate(total=Sum("count"))
+        .order_by(field, "status")
+    )
+
+    total, by_status, groups = 0, Counter(), {}
+    for value, lesson_status, count in rows:
+        if not count:
+            continue
+        total += count
+        by_status[lesson_status] += count
+        group = groups.setdefault(value, {group_by: value, "total": 0, "by_status": {}})
+        group["total"] += count
+        group["by_status"][lesson_status] = count
+
+    return {
+        "total": total,
+        "by_status": dict(by_status),
+        "groups": list(groups.values()),
+    }
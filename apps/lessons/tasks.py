@@ -1,93 +1,125 @@
-import time
-
 from celery import shared_task
 from celery.utils.log import get_task_logger
-
-from .models import Lesson
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from .models import LESSON_AUTO_TRANSITIONS, Lesson
+from .notifications import (
+    LESSON_CANCELLED,
+    LESSON_COMPLETED,
+    LESSON_CREATED,
+    LESSON_STARTED,
+    build_notification,
+    deliver,
+)
 
 logger = get_task_logger(__name__)
 
+LIFECYCLE_LOCK = "lessons:lifecycle:lock"
+LIFECYCLE_LOCK_TIMEOUT = 5 * 60
+
 
 @shared_task(bind=True, max_retries=3)
-def send_lesson_created_notification(self, lesson_id):
-    """Уведомление о создании урока"""
+def deliver_lesson_notifications(self, kind, lesson_ids):
+    """Пакетная доставка уведомлений одного типа по списку уроков"""
+    lessons = Lesson.objects.filter(id__in=lesson_ids).only("id", "title", "student_id")
+    notifications = [build_notification(kind, lesson) for lesson in lessons]
+    skipped = len(lesson_ids) - len(notifications)
+    if skipped:
+        logger.warning(f"{skipped} уроков из {len(lesson_ids)} не найдено")
+
+    report = deliver(notifications)
+    logger.info(
+        f"[CELERY] {kind}: отправлено {len(report.sent)} уведомлений "
+        f"за {report.elapsed:.2f} с ({report.rate:.0f}/с)"
+    )
+
+    if report.failed:
+        # Повторяем только недоставленные уведомления.
+        failed_ids = [notification.lesson_id for notification in report.failed]
+        raise self.retry(args=(kind, failed_ids), countdown=60)
+
+    return {
+        "status": "success",
+        "task": kind,
+        "sent": len(report.sent),
+        "skipped": skipped,
+    }
+
+
+def send_lesson_notification(task, kind, lesson_id):
+    """Доставка одного уведомления через тот же механизм, что и пакетная"""
     try:
-        lesson = Lesson.objects.get(id=lesson_id)
-        message = f"Урок создан: '{lesson.title}' {lesson_id}, для студента {lesson.student_id}"
-        logger.info(f"[CELERY] {message}")
-        time.sleep(5)
-        message_success = f"Уведомление по уроку: '{lesson.title}' {lesson_id}, для студента {lesson.student_id} успешно отправлено"
-        logger.info(f"[CELERY] {message_success}")
-        return {"status": "success", "task": "lesson_created", "lesson_id": lesson_id}
-
+        lesson = Lesson.objects.only("id", "title", "student_id").get(id=lesson_id)
     except Lesson.DoesNotExist:
         logger.warning(f"Lesson {lesson_id} не найден")
         return {"status": "skipped", "reason": "lesson_not_found"}
-    except Exception as exc:
-        logger.error(f"Ошибка: {exc}")
-        raise self.retry(exc=exc, countdown=60)
 
+    report = deliver([build_notification(kind, lesson)])
+    if report.failed:
+        raise task.retry(countdown=60)
+    return {"status": "success", "task": kind, "lesson_id": lesson_id}
 
-@shared_task(bind=True, max_retries=3)
-def send_lesson_started_notification(self, lesson_id):
-    """Уведомление о начале урока"""
-    try:
-        lesson = Lesson.objects.get(id=lesson_id)
 
-        message = f"Урок начался: '{lesson.title}'"
-        logger.info(f"[CELERY] {message}")
-        time.sleep(5)
-        message_success = f"Уведомление о завершении урока: '{lesson.title}' {lesson_id}, для студента {lesson.student_id} успешно отправлено"
-        logger.info(f"[CELERY] {message_success}")
+@shared_task(bind=True, max_retries=3)
+def send_lesson_created_notification(self, lesson_id):
+    """Уведомление о создании урока"""
+    return send_lesson_notification(self, LESSON_CREATED, lesson_id)
 
-        return {"status": "success", "task": "lesson_completed", "lesson_id": lesson_id}
 
-    except Lesson.DoesNotExist:
-        logger.warning(f"Lesson {lesson_id} не найден")
-        return {"status": "skipped", "reason": "lesson_not_found"}
-    except Exception as exc:
-        logger.error(f"Ошибка: {exc}")
-        raise self.retry(exc=exc, countdown=60)
+@shared_task(bind=True, max_retries=3)
+def send_lesson_started_notification(self, lesson_id):
+    """Уведомление о начале урока"""
+    return send_lesson_notification(self, LESSON_STARTED, lesson_id)
 
 
 @shared_task(bind=True, max_retries=3)
 def send_lesson_completed_notification(self, lesson_id):
     """Уведомление о завершении урока"""
-    try:
-        lesson = Lesson.objects.get(id=lesson_id)
-
-        message = f"Урок завершен: '{lesson.title}'"
-        logger.info(f"[CELERY] {message}")
-        time.sleep(5)
-        message_success = f"Уведомление о завершении урока: '{lesson.title}' {lesson_id}, для студента {lesson.student_id} успешно отправлено"
-        logger.info(f"[CELERY] {message_success}")
-
-        return {"status": "success", "task": "lesson_completed", "lesson_id": lesson_id}
-
-    except Lesson.DoesNotExist:
-        logger.warning(f"Lesson {lesson_id} не найден")
-        return {"status": "skipped", "reason": "lesson_not_found"}
-    except Exception as exc:
-        logger.error(f"Ошибка: {exc}")
-        raise self.retry(exc=exc, countdown=60)
+    return send_lesson_notification(self, LESSON_COMPLETED, lesson_id)
 
 
 @shared_task(bind=True, max_retries=3)
 def send_lesson_cancelled_notification(self, lesson_id):
     """Уведомление об отмене урока"""
+    return send_lesson_notification(self, LESSON_CANCELLED, lesson_id)
+
+
+# Результат запуска (число переходов) сохраняется для мониторинга.
+@shared_task(ignore_result=False)
+def sweep_lesson_lifecycle():
+    """
+    Автоматический ход уроков по времени: scheduled -> in_progress в start_time,
+    in_progress -> completed в end_time.
+
+    Уроки переводятся пачками по BATCH_SIZE одним UPDATE (bulk_transition),
+    не больше MAX_BATCHES пачек на переход за запуск; остаток заберет
+    следующий запуск. Выборка идет по частичным индексам активных уроков.
+    Уведомления уходят пачками через outbox, как и при массовых переходах из API.
+    """
+    if not cache.add(LIFECYCLE_LOCK, 1, LIFECYCLE_LOCK_TIMEOUT):
+        logger.info("Переходы уроков уже выполняются, пропускаем запуск")
+        return {"status": "skipped"}
+
+    config = settings.LESSON_LIFECYCLE
+    batch_size = config["BATCH_SIZE"]
+    now = timezone.now()
+    applied = {}
     try:
-        lesson = Lesson.objects.get(id=lesson_id)
-
-        message = f"Урок отменен: '{lesson.title}'"
-        logger.info(f"[CELERY] {message}")
-        time.sleep(5)
-        message_success = f"Уведомление об отмене урока: '{lesson.title}' {lesson_id}, для студента {lesson.student_id} успешно отправлено"
-        logger.info(f"[CELERY] {message_success}")
-        return {"status": "success", "task": "lesson_cancelled", "lesson_id": lesson_id}
-
-    except Lesson.DoesNotExist:
-        logger.warning(f"Lesson {lesson_id} не найден")
-        return {"status": "skipped", "reason": "lesson_not_found"}
-    except Exception as exc:
-        logger.error(f"Ошибка: {exc}")
-        raise self.retry(exc=exc, countdown=60)
+        # Сначала start: просроченный запланированный урок завершится в том же запуске.
+        for action in LESSON_AUTO_TRANSITIONS:
+            applied[action] = 0
+            for _ in range(config["MAX_BATCHES"]):
+                results = Lesson.objects.due(action, now)[:batch_size].bulk_transition(
+                    action
+                )
+                applied[action] += sum(result.applied for result in results)
+                if len(results) < batch_size:
+                    break
+    finally:
+        cache.delete(LIFECYCLE_LOCK)
+
+    if any(applied.values()):
+        logger.info(f"[CELERY] Автоматические переходы уроков: {applied}")
+    return {"status": "success", **applied}
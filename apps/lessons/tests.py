@@ -0,0 +1,15 @@
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from .models import Lesson
+
+
+class BulkTransitionTests(TestCase):
+    def test_empty_queryset(self):
+        self.assertEqual(Lesson.objects.none().bulk_transition("cancel"), [])
+
+    def test_anonymous_role_filter(self):
+        """Фильтр role для анонимного пользователя дает none(): пустой результат, а не 500."""
+        response = APIClient().post("/api/v1/lessons/bulk/cancel/?role=teacher")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["results"], [])
@@ -10,6 +10,23 @@ urlpatterns = [
         views.LessonViewSet.as_view({"get": "list", "post": "create"}),
         name="lesson-list-create",
     ),
+    path(
+        "lessons/export/",
+        views.LessonViewSet.as_view(
+            {"get": "export"}, **views.LessonViewSet.export.kwargs
+        ),
+        name="lesson-export",
+    ),
+    path(
+        "lessons/stats/",
+        views.LessonViewSet.as_view({"get": "stats"}),
+        name="lesson-stats",
+    ),
+    path(
+        "lessons/bulk/<str:transition>/",
+        views.LessonViewSet.as_view({"post": "bulk_transition"}),
+        name="lesson-bulk-transition",
+    ),
     path(
         "lessons/<int:pk>/",
         views.LessonViewSet.as_view(
@@ -34,4 +51,14 @@ urlpatterns = [
         views.LessonViewSet.as_view({"post": "cancel"}),
         name="lesson-cancel",
     ),
+    path(
+        "users/availability/",
+        views.AvailabilityViewSet.as_view({"get": "list"}),
+        name="availability-list",
+    ),
+    path(
+        "users/<int:pk>/availability/",
+        views.AvailabilityViewSet.as_view({"get": "retrieve"}),
+        name="availability-detail",
+    ),
 ]
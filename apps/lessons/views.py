@@ -1,30 +1,93 @@
+from django.core.exceptions import ValidationError
+from django.db import transaction
 from django.db.models import Q
+from django.http import Http404, StreamingHttpResponse
+from django.shortcuts import aget_object_or_404, get_object_or_404
 from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema, no_body
-from rest_framework import status, viewsets
+from rest_framework import serializers, status, viewsets
 from rest_framework.decorators import action
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.permissions import AllowAny, BasePermission, IsAuthenticated
 from rest_framework.response import Response
 
-from .models import Lesson, LessonStatus
-from .serializers import LessonSerializer
+from .availability import get_availability
+from .cache import aget_lesson_detail, get_lesson_detail
+from .conditional import conditional_response
+from .filters import ROLES, LessonFilterBackend
+from .models import LESSON_TRANSITIONS, Lesson, LessonStatus
+from .pagination import LessonCursorPagination
+from .renderers import CSVRenderer, NDJSONRenderer
+from .stats import get_stats
+from .serializers import (
+    AvailabilityQuerySerializer,
+    LessonBulkTransitionSerializer,
+    LessonRowSerializer,
+    LessonSerializer,
+    LessonStatsQuerySerializer,
+)
+from .viewsets import AsyncReadMixin, ReplicaReadMixin, aiterate
 
+FILTER_PARAMS = ("role", "status", "upcoming")
 
-class LessonViewSet(viewsets.ModelViewSet):
+FILTER_PARAMETERS = [
+    openapi.Parameter(
+        "role",
+        openapi.IN_QUERY,
+        description="Роль текущего пользователя: 'teacher' или 'student'",
+        type=openapi.TYPE_STRING,
+        enum=ROLES,
+    ),
+    openapi.Parameter(
+        "status",
+        openapi.IN_QUERY,
+        description="Фильтр по статусу урока",
+        type=openapi.TYPE_STRING,
+        enum=LessonStatus.values,
+    ),
+    openapi.Parameter(
+        "upcoming",
+        openapi.IN_QUERY,
+        description="Только предстоящие уроки",
+        type=openapi.TYPE_BOOLEAN,
+        default=False,
+    ),
+]
+
+# Строк на одно чтение из серверного курсора при выгрузке.
+EXPORT_CHUNK_SIZE = 2000
+
+
+class LessonViewSet(ReplicaReadMixin, AsyncReadMixin, viewsets.ModelViewSet):
     """
     ViewSet для управления уроками.
 
     Доступные действия:
     - GET /lessons/ - список уроков (учитель видит свои уроки, студент видит свои уроки)
     - POST /lessons/ - создание нового урока (текущий пользователь становится учителем)
+    - GET /lessons/export/?format=ndjson|csv - потоковая выгрузка уроков по фильтрам списка
+    - GET /lessons/stats/?from=&to= - статистика уроков по дням, преподавателям и статусам
     - GET /lessons/<int:pk>/ - просмотр конкретного урока
     - POST /lessons/<int:pk>/complete/ - завершение урока (только учитель)
     - POST /lessons/<int:pk>/cancel/ - отмена урока (только учитель)
+
+    В режиме ASGI список, детали и выгрузка обрабатываются асинхронно (alist,
+    aretrieve, aexport), см. viewsets.AsyncReadMixin.
+
+    Список и детали отдают ETag и Last-Modified по updated_at и отвечают 304
+    на If-None-Match / If-Modified-Since, см. conditional.py.
+
+    Список, выгрузка и статистика читаются с реплик (DB_REPLICAS), если
+    клиент недавно не писал, см. viewsets.ReplicaReadMixin. Детали -
+    из default: промах кеша деталей не должен сохранить устаревшие данные.
     """
 
     queryset = Lesson.objects.all()
     serializer_class = LessonSerializer
     permission_classes = [AllowAny]
+    filter_backends = [LessonFilterBackend]
+    pagination_class = LessonCursorPagination
+    async_actions = {"list": "alist", "retrieve": "aretrieve", "export": "aexport"}
+    replica_actions = ("list", "export", "stats")
 
     def perform_create(self, serializer):
         """При создании урока текущий пользователь становится учителем"""
@@ -37,46 +100,151 @@ class LessonViewSet(viewsets.ModelViewSet):
         В качестве теста даем возможно делать запрос всем 
         Тек же нет ограничений на возможность просмотра уроков других студентов и преподавателей.
         """,
+        manual_parameters=FILTER_PARAMETERS,
+        responses={
+            200: openapi.Response("Успешно", LessonSerializer(many=True)),
+            401: openapi.Response("Не авторизован"),
+        },
+    )
+    def list(self, request, *args, **kwargs):
+        """GET /api/v1/lessons/ - список уроков"""
+        # Только чтение: колонки через values() без моделей и полей DRF.
+        serializer = LessonRowSerializer()
+        queryset = serializer.values(
+            self.filter_queryset(self.get_queryset()), "updated_at"
+        )
+        page = self.paginate_queryset(queryset)
+
+        if page is not None:
+            return self._page_response(serializer, page)
+
+        return self._list_response(serializer, list(queryset))
+
+    async def alist(self, request, *args, **kwargs):
+        """GET /api/v1/lessons/ - список уроков, асинхронный ORM"""
+        serializer = LessonRowSerializer()
+        queryset = serializer.values(
+            self.filter_queryset(self.get_queryset()), "updated_at"
+        )
+        page = await self.paginator.apaginate_queryset(queryset, request, view=self)
+
+        if page is not None:
+            return self._page_response(serializer, page)
+
+        return self._list_response(serializer, [row async for row in queryset])
+
+    @swagger_auto_schema(
+        operation_summary="Выгрузить уроки",
+        operation_description="""
+        Потоковая выгрузка всех уроков, подходящих под фильтры списка, без пагинации.
+        Строки читаются из серверного курсора пачками и сразу отправляются клиенту,
+        поэтому память не зависит от размера выгрузки.
+        Формат: ?format=ndjson (по умолчанию) или ?format=csv.
+        """,
         manual_parameters=[
             openapi.Parameter(
-                "role",
+                "format",
                 openapi.IN_QUERY,
-                description="Роль пользователя: 'teacher' или 'student'",
+                description="Формат выгрузки",
                 type=openapi.TYPE_STRING,
-                enum=["teacher", "student"],
-                default="student",
+                enum=[NDJSONRenderer.format, CSVRenderer.format],
+                default=NDJSONRenderer.format,
             ),
+            *FILTER_PARAMETERS,
+        ],
+        responses={
+            200: openapi.Response("Поток уроков в NDJSON или CSV"),
+            400: openapi.Response("Ошибка в параметрах фильтра"),
+            404: openapi.Response("Неизвестный формат"),
+        },
+    )
+    @action(
+        detail=False,
+        methods=["get"],
+        renderer_classes=[NDJSONRenderer, CSVRenderer],
+        pagination_class=None,
+    )
+    def export(self, request):
+        """GET /api/v1/lessons/export/?format=ndjson|csv - потоковая выгрузка"""
+        return self._export_response(self._export_chunks())
+
+    async def aexport(self, request):
+        """
+        Выгрузка под ASGI: тот же поток, но асинхронный, иначе Django
+        собрал бы его в памяти целиком до отправки первого байта.
+        """
+        return self._export_response(aiterate(self._export_chunks()))
+
+    @swagger_auto_schema(
+        operation_summary="Статистика уроков",
+        operation_description="""
+        Число уроков за дни [from, to] по статусам с разбивкой по дням или
+        преподавателям. Читается из сводной таблицы, которая обновляется
+        вместе с уроками, без GROUP BY по всем урокам.
+        """,
+        manual_parameters=[
             openapi.Parameter(
-                "status",
+                "from",
+                openapi.IN_QUERY,
+                description="Первый день периода",
+                type=openapi.TYPE_STRING,
+                format=openapi.FORMAT_DATE,
+                required=True,
+            ),
+            openapi.Parameter(
+                "to",
+                openapi.IN_QUERY,
+                description="Последний день периода (не больше 366 дней)",
+                type=openapi.TYPE_STRING,
+                format=openapi.FORMAT_DATE,
+                required=True,
+            ),
+            openapi.Parameter(
+                "group_by",
                 openapi.IN_QUERY,
-                description="Фильтр по статусу урока",
+                description="Разбивка: по дням или по преподавателям",
                 type=openapi.TYPE_STRING,
-                enum=["draft", "scheduled", "completed", "cancelled"],
+                enum=["day", "teacher"],
+                default="day",
+            ),
+            openapi.Parameter(
+                "teacher",
+                openapi.IN_QUERY,
+                description="Только уроки преподавателя",
+                type=openapi.TYPE_INTEGER,
             ),
             openapi.Parameter(
-                "upcoming",
+                "status",
                 openapi.IN_QUERY,
-                description="Только предстоящие уроки",
-                type=openapi.TYPE_BOOLEAN,
-                default=False,
+                description="Только уроки в статусе",
+                type=openapi.TYPE_STRING,
+                enum=LessonStatus.values,
             ),
         ],
         responses={
-            200: openapi.Response("Успешно", LessonSerializer(many=True)),
-            401: openapi.Response("Не авторизован"),
+            200: openapi.Response("Статистика"),
+            400: openapi.Response("Ошибка в параметрах"),
         },
     )
-    def list(self, request, *args, **kwargs):
-        """GET /api/v1/lessons/ - список уроков"""
-        queryset = self.get_queryset()
-        page = self.paginate_queryset(queryset)
-
-        if page is not None:
-            serializer = self.get_serializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
-
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+    @action(detail=False, methods=["get"], pagination_class=None)
+    def stats(self, request):
+        """GET /api/v1/lessons/stats/?from=&to= - статистика уроков"""
+        serializer = LessonStatsQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        params = serializer.validated_data
+        return Response(
+            {
+                "from": params["from"],
+                "to": params["to"],
+                **get_stats(
+                    params["from"],
+                    params["to"],
+                    group_by=params["group_by"],
+                    teacher_id=params.get("teacher"),
+                    status=params.get("status"),
+                ),
+            }
+        )
 
     @swagger_auto_schema(
         operation_summary="Создать новый урок",
@@ -113,9 +281,64 @@ class LessonViewSet(viewsets.ModelViewSet):
     )
     def retrieve(self, request, *args, **kwargs):
         """GET /api/v1/lessons/{id}/ - детали урока"""
-        instance = self.get_object()
-        serializer = self.get_serializer(instance)
-        return Response(serializer.data)
+        if any(param in request.query_params for param in FILTER_PARAMS):
+            return self._instance_response(self.get_object())
+
+        def load():
+            return self._detail_entry(self.get_object())
+
+        entry, hit = get_lesson_detail(kwargs[self.lookup_field], load)
+        return self._detail_response(entry, hit)
+
+    async def aretrieve(self, request, *args, **kwargs):
+        """GET /api/v1/lessons/{id}/ - детали урока, асинхронный ORM"""
+
+        async def aload():
+            return self._detail_entry(await self.aget_object())
+
+        if any(param in request.query_params for param in FILTER_PARAMS):
+            return self._instance_response(await self.aget_object())
+
+        entry, hit = await aget_lesson_detail(kwargs[self.lookup_field], aload)
+        return self._detail_response(entry, hit)
+
+    def _detail_entry(self, instance):
+        """Детали урока для кеша: данные ответа и updated_at для ETag."""
+        return {
+            "lesson": dict(self.get_serializer(instance).data),
+            "updated_at": instance.updated_at,
+        }
+
+    def _detail_response(self, entry, hit):
+        lesson = entry["lesson"]
+        response = conditional_response(
+            self.request,
+            [(lesson["id"], entry["updated_at"])],
+            lambda: Response(lesson),
+        )
+        response["X-Cache"] = "HIT" if hit else "MISS"
+        return response
+
+    def _instance_response(self, instance):
+        """Детали урока без кеша; урок сериализуется, только если изменился."""
+        return conditional_response(
+            self.request,
+            [(instance.pk, instance.updated_at)],
+            lambda: Response(self.get_serializer(instance).data),
+        )
+
+    async def aget_object(self):
+        """get_object() через асинхронный ORM"""
+        queryset = self.filter_queryset(self.get_queryset())
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            instance = await aget_object_or_404(
+                queryset, **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+            )
+        except (TypeError, ValueError, ValidationError):
+            raise Http404
+        self.check_object_permissions(self.request, instance)
+        return instance
 
     @swagger_auto_schema(
         operation_summary="Начать урок",
@@ -148,16 +371,12 @@ class LessonViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=["post"])
     def start(self, request, pk=None):
         """Начать урок"""
-        lesson = self.get_object()
-        if lesson.start_lesson():
-            return Response({"status": "Урок начат"})
-        else:
-            return Response(
-                {
-                    "error": 'Не удалось начать урок. Урок должен быть в статусе "Запланирован"'
-                },
-                status=status.HTTP_400_BAD_REQUEST,
-            )
+        return self._transition(
+            pk,
+            "start",
+            "Урок начат",
+            'Не удалось начать урок. Урок должен быть в статусе "Запланирован"',
+        )
 
     @swagger_auto_schema(
         operation_summary="Завершить урок",
@@ -190,14 +409,12 @@ class LessonViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=["post"])
     def complete(self, request, pk=None):
         """Завершить урок"""
-        lesson = self.get_object()
-        if lesson.complete_lesson():
-            return Response({"status": "Урок завершен"})
-        else:
-            return Response(
-                {"error": "Не удалось завершить урок. Урок должен быть в статусе 'В процессе'"},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
+        return self._transition(
+            pk,
+            "complete",
+            "Урок завершен",
+            "Не удалось завершить урок. Урок должен быть в статусе 'В процессе'",
+        )
 
     @swagger_auto_schema(
         operation_summary="Отменить урок",
@@ -230,11 +447,299 @@ class LessonViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=["post"])
     def cancel(self, request, pk=None):
         """Отменить урок"""
-        lesson = self.get_object()
-        if lesson.cancel_lesson():
-            return Response({"status": "Урок отменен"})
+        return self._transition(
+            pk,
+            "cancel",
+            "Урок отменен",
+            "Невозможно отменить завершенный или уже отмененный урок",
+        )
+
+    @swagger_auto_schema(
+        operation_summary="Массовый переход статуса уроков",
+        operation_description="""
+        Выполняет start/complete/cancel для набора уроков одним UPDATE.
+        Уроки задаются списком ids в теле запроса или фильтрами списка
+        (role, status, upcoming) в query-параметрах; в режиме фильтра
+        обрабатывается не более 1000 уроков с подходящим статусом за запрос.
+        Для каждого урока возвращается результат: applied, not_allowed или not_found.
+        """,
+        request_body=LessonBulkTransitionSerializer,
+        responses={
+            200: openapi.Response("Результаты по урокам"),
+            400: openapi.Response("Не переданы ids или фильтр"),
+            404: openapi.Response("Неизвестный переход"),
+        },
+    )
+    @action(detail=False, methods=["post"], url_path="bulk/(?P<transition>[^/.]+)")
+    def bulk_transition(self, request, transition=None):
+        """POST /api/v1/lessons/bulk/{start|complete|cancel}/ - массовый переход"""
+        if transition not in LESSON_TRANSITIONS:
+            raise Http404("Неизвестный переход")
+
+        serializer = LessonBulkTransitionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = serializer.validated_data.get("ids")
+
+        if ids:
+            ids = list(dict.fromkeys(ids))
+            queryset = self.filter_queryset(self.get_queryset()).filter(id__in=ids)
+        elif any(param in request.query_params for param in FILTER_PARAMS):
+            sources = LESSON_TRANSITIONS[transition].sources
+            queryset = self.filter_queryset(self.get_queryset()).filter(
+                status__in=sources
+            )[: serializer.MAX_IDS]
         else:
             return Response(
-                {"error": "Невозможно отменить завершенный или уже отмененный урок"},
+                {"error": "Передайте ids или фильтр (role, status, upcoming)"},
                 status=status.HTTP_400_BAD_REQUEST,
             )
+
+        found = {result.id: result for result in queryset.bulk_transition(transition)}
+        outcomes = []
+        for lesson_id in ids or found:
+            result = found.get(lesson_id)
+            if result is None:
+                outcomes.append({"id": lesson_id, "result": "not_found"})
+            elif result.applied:
+                outcomes.append(
+                    {
+                        "id": lesson_id,
+                        "result": "applied",
+                        "previous_status": result.previous_status,
+                        "status": result.lesson.status,
+                    }
+                )
+            else:
+                outcomes.append(
+                    {
+                        "id": lesson_id,
+                        "result": "not_allowed",
+                        "status": result.previous_status,
+                    }
+                )
+
+        applied = sum(1 for outcome in outcomes if outcome["result"] == "applied")
+        return Response(
+            {
+                "applied": applied,
+                "failed": len(outcomes) - applied,
+                "results": outcomes,
+            }
+        )
+
+    def _page_response(self, serializer, page):
+        """Страница списка; ссылки next/previous зависят от адреса и соседних страниц."""
+        paginator = self.paginator
+        return conditional_response(
+            self.request,
+            [(row["id"], row["updated_at"]) for row in page],
+            lambda: self.get_paginated_response(serializer.serialize(page)),
+            self.request.build_absolute_uri(),
+            paginator.has_next,
+            paginator.has_previous,
+        )
+
+    def _list_response(self, serializer, rows):
+        return conditional_response(
+            self.request,
+            [(row["id"], row["updated_at"]) for row in rows],
+            lambda: Response(serializer.serialize(rows)),
+        )
+
+    def _checks_object_permissions(self):
+        """Переопределяет ли хоть один класс прав has_object_permission."""
+        return any(
+            type(permission).has_object_permission
+            is not BasePermission.has_object_permission
+            for permission in self.get_permissions()
+        )
+
+    def _export_chunks(self):
+        """Байты выгрузки в формате запроса; строки читаются при итерации."""
+        serializer = LessonRowSerializer()
+        queryset = serializer.values(self.filter_queryset(self.get_queryset()))
+        # База выбирается сейчас: строки читаются уже после выхода из middleware.
+        queryset = queryset.using(queryset.db)
+        rows = self._export_rows(queryset, serializer)
+        return self.request.accepted_renderer.stream(rows, serializer.fields)
+
+    def _export_response(self, chunks):
+        renderer = self.request.accepted_renderer
+        response = StreamingHttpResponse(
+            chunks,
+            content_type=f"{renderer.media_type}; charset={renderer.charset}",
+        )
+        response["Content-Disposition"] = (
+            f'attachment; filename="lessons.{renderer.format}"'
+        )
+        return response
+
+    def _export_rows(self, queryset, serializer):
+        """
+        Строки выгрузки из серверного курсора.
+
+        Курсор открывается в транзакции: вне ее (autocommit) PostgreSQL
+        создает курсор WITH HOLD и материализует весь результат до первой строки.
+        Заодно выгрузка читается из одного снимка данных.
+        """
+        with transaction.atomic(using=queryset.db):
+            for row in queryset.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+                yield serializer.to_representation(row)
+
+    def _transition(self, pk, action, success_message, error_message):
+        """
+        Переход статуса одним UPDATE: 200, 400 (запрещенный переход) или 404.
+
+        Урок ищется среди уроков, видимых через фильтры ViewSet. Если права
+        проверяют объект (has_object_permission), урок сначала блокируется и
+        проверяется, и только потом переводится.
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        try:
+            if self._checks_object_permissions():
+                with transaction.atomic():
+                    lesson = get_object_or_404(queryset.select_for_update(), pk=pk)
+                    self.check_object_permissions(self.request, lesson)
+                    result = queryset.transition(pk, action)
+            else:
+                result = queryset.transition(pk, action)
+        except Lesson.DoesNotExist:
+            raise Http404("Урок не найден")
+
+        lesson = result.lesson
+        if lesson is None:
+            return Response(
+                {"error": error_message, "current_status": result.previous_status},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        return Response(
+            {
+                "status": success_message,
+                "lesson": {
+                    "id": lesson.id,
+                    "title": lesson.title,
+                    "status": lesson.status,
+                },
+            }
+        )
+
+
+AVAILABILITY_PARAMETERS = [
+    openapi.Parameter(
+        "from",
+        openapi.IN_QUERY,
+        description="Начало окна (ISO 8601)",
+        type=openapi.TYPE_STRING,
+        format=openapi.FORMAT_DATETIME,
+        required=True,
+    ),
+    openapi.Parameter(
+        "to",
+        openapi.IN_QUERY,
+        description="Конец окна (ISO 8601), не больше 31 дня от начала",
+        type=openapi.TYPE_STRING,
+        format=openapi.FORMAT_DATETIME,
+        required=True,
+    ),
+    openapi.Parameter(
+        "slot",
+        openapi.IN_QUERY,
+        description="Длина свободного слота, мин",
+        type=openapi.TYPE_INTEGER,
+        default=60,
+    ),
+]
+
+
+class AvailabilityViewSet(viewsets.ViewSet):
+    """
+    Занятость преподавателей и студентов по урокам.
+
+    - GET /users/<int:pk>/availability/ - занятые интервалы и свободные слоты пользователя
+    - GET /users/availability/?ids=1,2,3 - то же для нескольких пользователей одним запросом
+    """
+
+    permission_classes = [AllowAny]
+
+    @swagger_auto_schema(
+        operation_summary="Занятость пользователя",
+        operation_description="""
+        Занятые интервалы пользователя (как преподавателя и как студента, без
+        отмененных уроков), слитые и обрезанные по окну [from, to), и свободные
+        слоты длиной slot минут по сетке от from.
+        """,
+        manual_parameters=AVAILABILITY_PARAMETERS,
+        responses={
+            200: openapi.Response("Занятость пользователя"),
+            400: openapi.Response("Ошибка в параметрах"),
+            404: openapi.Response("Пользователь не найден"),
+        },
+    )
+    def retrieve(self, request, pk=None):
+        """GET /api/v1/users/{id}/availability/ - занятость пользователя"""
+        params = self._get_params(request)
+        results = self._get_results([int(pk)], params)
+        if not results:
+            raise Http404("Пользователь не найден")
+        return Response(results[0])
+
+    @swagger_auto_schema(
+        operation_summary="Занятость нескольких пользователей",
+        operation_description="""
+        То же, что и для одного пользователя, для списка ids (не более 100)
+        одним запросом к БД, например для сетки на неделю. Несуществующие
+        пользователи в ответ не попадают.
+        """,
+        manual_parameters=[
+            openapi.Parameter(
+                "ids",
+                openapi.IN_QUERY,
+                description="Пользователи через запятую",
+                type=openapi.TYPE_STRING,
+                required=True,
+            ),
+            *AVAILABILITY_PARAMETERS,
+        ],
+        responses={
+            200: openapi.Response("Занятость пользователей"),
+            400: openapi.Response("Ошибка в параметрах"),
+        },
+    )
+    def list(self, request):
+        """GET /api/v1/users/availability/?ids=... - занятость нескольких пользователей"""
+        params = self._get_params(request)
+        if "ids" not in params:
+            raise serializers.ValidationError({"ids": "Обязательный параметр"})
+        return Response({"results": self._get_results(params["ids"], params)})
+
+    def _get_params(self, request):
+        serializer = AvailabilityQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        return serializer.validated_data
+
+    def _get_results(self, user_ids, params):
+        start, end, slot = params["from"], params["to"], params["slot"]
+        availability = get_availability(user_ids, start, end, slot)
+
+        format_datetime = serializers.DateTimeField().to_representation
+        window = {
+            "from": format_datetime(start),
+            "to": format_datetime(end),
+            "slot": int(slot.total_seconds() // 60),
+        }
+
+        def intervals(items):
+            return [
+                {"start": format_datetime(item_start), "end": format_datetime(item_end)}
+                for item_start, item_end in items
+            ]
+
+        return [
+            {
+                "user": user_id,
+                **window,
+                "busy": intervals(data["busy"]),
+                "free": intervals(data["free"]),
+            }
+            for user_id, data in availability.items()
+        ]
@@ -0,0 +1,107 @@
+"""
+Примеси ViewSet: чтение с реплик и асинхронные GET-обработчики.
+
+ReplicaReadMixin отправляет чтения действий replica_actions на реплики
+(core/replicas.py), если клиент недавно не писал в БД.
+
+Асинхронные GET-обработчики ViewSet для режима ASGI (core/asgi.py).
+
+DRF обрабатывает запросы только синхронно, поэтому под ASGI каждый запрос
+занимает поток. AsyncReadMixin.as_view подменяет представление корутиной:
+действия из async_actions выполняются в цикле событий с асинхронным ORM,
+остальные методы (запись) - прежним синхронным представлением через
+sync_to_async. Аутентификация и права проверяются тем же initial() в потоке.
+
+Включается настройкой ASYNC_VIEWS; под WSGI представления остаются прежними.
+
+Потоковый ответ под ASGI должен быть асинхронным: синхронный итератор
+StreamingHttpResponse Django целиком собирает в список до первого байта.
+aiterate() отдает синхронный поток по одному элементу.
+"""
+
+import functools
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from core import replicas
+
+
+async def aiterate(iterator):
+    """
+    Асинхронный поток по синхронному итератору. Элементы готовятся в потоке
+    запроса (thread_sensitive), поэтому открытая итератором транзакция и
+    курсор остаются на одном соединении, а в памяти только один элемент.
+    """
+    done = object()
+    get_next = sync_to_async(next)
+    try:
+        while (item := await get_next(iterator, done)) is not done:
+            yield item
+    finally:
+        if hasattr(iterator, "close"):
+            await sync_to_async(iterator.close)()
+
+
+class ReplicaReadMixin:
+    # Действия, чтения которых можно выполнять на реплике.
+    replica_actions = ()
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        # После аутентификации: запросы пользователя и токена идут в default.
+        if self.action in self.replica_actions:
+            replicas.use_replica(request)
+
+
+class AsyncReadMixin:
+    # Действие ViewSet -> имя асинхронного обработчика.
+    async_actions = {}
+
+    @classmethod
+    def as_view(cls, actions=None, **initkwargs):
+        view = super().as_view(actions, **initkwargs)
+        methods = dict(actions)
+        if "get" in methods:
+            methods.setdefault("head", methods["get"])
+        async_methods = {
+            method: cls.async_actions[action]
+            for method, action in methods.items()
+            if action in cls.async_actions
+        }
+        if not settings.ASYNC_VIEWS or not async_methods:
+            return view
+
+        sync_view = sync_to_async(view)
+
+        # cls, actions и csrf_exempt переносятся для drf_yasg и CSRF.
+        @functools.wraps(view)
+        async def async_view(request, *args, **kwargs):
+            method = request.method.lower()
+            if method not in async_methods:
+                return await sync_view(request, *args, **kwargs)
+
+            self = cls(**initkwargs)
+            self.action_map = methods
+            self.request = request
+            self.args = args
+            self.kwargs = kwargs
+            handler = getattr(self, async_methods[method])
+            return await self.adispatch(handler, request, *args, **kwargs)
+
+        return async_view
+
+    async def adispatch(self, handler, request, *args, **kwargs):
+        """Как APIView.dispatch, но обработчик - корутина."""
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+            response = await handler(request, *args, **kwargs)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
@@ -0,0 +1,20 @@
+"""
+gunicorn ASGI server configuration (core.asgi:application, uvicorn workers).
+
+Процессная модель, preload и gc.freeze - как в gunicorn.conf.py. Воркер
+uvicorn не вызывает post_request, поэтому перезапуск по памяти недоступен
+и воркеры перезапускаются по числу запросов.
+"""
+
+import os
+import runpy
+
+base = runpy.run_path(os.path.join(os.path.dirname(__file__), "gunicorn.conf.py"))
+globals().update({name: value for name, value in base.items() if name[0] != "_"})
+
+worker_class = "uvicorn_worker.UvicornWorker"
+workers = max_workers(worker_class)  # noqa: F821
+threads = 1
+keepalive = 5
+max_requests = env_int("GUNICORN_MAX_REQUESTS", 10000)  # noqa: F821
+max_requests_jitter = max_requests // 20
@@ -1,13 +1,181 @@
-"""gunicorn WSGI server configuration."""
+"""
+gunicorn WSGI server configuration.
 
+Процессная модель задается переменными окружения:
 
-def max_workers():
-    return 1
+- GUNICORN_WORKER_CLASS - gthread (по умолчанию) или sync;
+- GUNICORN_WORKERS, GUNICORN_THREADS - по умолчанию считаются по доступным
+  CPU с учетом affinity и квоты cgroup (cpu.max), число воркеров
+  ограничено лимитом памяти cgroup из расчета GUNICORN_WORKER_MEMORY_MB;
+- GUNICORN_PRELOAD - приложение загружается в мастере до fork, объекты
+  замораживаются gc.freeze(), и воркеры делят страницы памяти с мастером;
+- GUNICORN_MAX_MEMORY_GROWTH_MB - воркер перезапускается, когда его RSS
+  вырос на это значение с момента fork (вместо перезапуска по числу запросов,
+  GUNICORN_MAX_REQUESTS по умолчанию выключен);
+- PROMETHEUS_MULTIPROC_DIR - каталог, через который воркеры отдают общие
+  метрики /metrics (core/metrics.py), очищается при запуске мастера.
 
+С preload мастер до fork загружает OpenAPI-схему (core/openapi.py).
+"""
+
+import gc
+import glob
+import math
+import os
+
+CGROUP_ROOT = "/sys/fs/cgroup"
+
+
+def env_int(name, default):
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+def env_bool(name, default):
+    value = os.getenv(name)
+    return value.lower() in ("1", "true", "yes") if value else default
+
+
+def read_cgroup(*names):
+    """Первое из значений cgroup v2 или v1, None если файла нет или лимита нет."""
+    for name in names:
+        try:
+            with open(os.path.join(CGROUP_ROOT, name)) as f:
+                value = f.read().split()
+        except OSError:
+            continue
+        if value and value[0] not in ("max", "-1"):
+            return value
+    return None
+
+
+def cpu_limit():
+    """CPU, доступные процессу: affinity и квота cgroup, не меньше одного."""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+
+    quota = read_cgroup("cpu.max")
+    if quota:
+        quota, period = int(quota[0]), int(quota[1])
+    else:
+        quota = read_cgroup("cpu/cpu.cfs_quota_us", "cpu,cpuacct/cpu.cfs_quota_us")
+        period = read_cgroup("cpu/cpu.cfs_period_us", "cpu,cpuacct/cpu.cfs_period_us")
+        quota = int(quota[0]) if quota and period else None
+        period = int(period[0]) if period else None
+    if quota and period:
+        cpus = min(cpus, math.ceil(quota / period))
+    return max(cpus, 1)
+
+
+def memory_limit():
+    """Лимит памяти cgroup в байтах или None."""
+    value = read_cgroup("memory.max", "memory/memory.limit_in_bytes")
+    # cgroup v1 без лимита отдает почти 2**63.
+    if value and int(value[0]) < 2**60:
+        return int(value[0])
+    return None
+
+
+def max_workers(worker_class):
+    """
+    Воркеры по умолчанию: 2 * CPU + 1 для sync, CPU + 1 для потоковых и
+    асинхронных воркеров (ожидание ввода-вывода перекрывают потоки).
+    """
+    cpus = cpu_limit()
+    workers = 2 * cpus + 1 if worker_class == "sync" else cpus + 1
+    limit = memory_limit()
+    if limit:
+        workers = min(workers, limit // (worker_memory_mb * 1024 * 1024))
+    return env_int("GUNICORN_WORKERS", max(workers, 1))
+
+
+def rss():
+    """RSS текущего процесса в байтах."""
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+worker_memory_mb = env_int("GUNICORN_WORKER_MEMORY_MB", 512)
+max_memory_growth_mb = env_int("GUNICORN_MAX_MEMORY_GROWTH_MB", 256)
 
 bind = "0.0.0.0:8000"
 timeout = 90
-max_requests = 1000
-max_requests_jitter = 50
-worker_class = "sync"
-workers = max_workers()
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gthread")
+workers = max_workers(worker_class)
+threads = env_int("GUNICORN_THREADS", 4 if worker_class == "gthread" else 1)
+max_requests = env_int("GUNICORN_MAX_REQUESTS", 0)
+max_requests_jitter = max_requests // 20
+preload_app = env_bool("GUNICORN_PRELOAD", True)
+
+# Задается до загрузки приложения: prometheus_client читает его при импорте.
+metrics_dir = os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", "/tmp/prometheus")
+
+if preload_app:
+    # Сборка мусора в мастере не должна освобождать объекты между страницами,
+    # которые потом разделят воркеры (см. документацию gc.freeze). Включается
+    # снова, как только приложение загружено и заморожено (freeze_master).
+    gc.disable()
+
+
+def freeze_master():
+    """Объекты загруженного приложения - в постоянное поколение, сборщик мастера снова включен."""
+    gc.freeze()
+    gc.enable()
+
+
+def on_starting(server):
+    # Файлы метрик прошлого запуска отдавались бы как значения живых воркеров.
+    os.makedirs(metrics_dir, exist_ok=True)
+    for path in glob.glob(os.path.join(metrics_dir, "*.db")):
+        os.remove(path)
+
+
+def when_ready(server):
+    if preload_app:
+        # OpenAPI-схема загружается один раз в мастере и общая для воркеров.
+        from core.openapi import load_specs
+
+        load_specs()
+        freeze_master()
+
+
+def on_reload(server):
+    # HUP заново выполняет этот файл конфигурации, то есть и gc.disable().
+    if preload_app:
+        freeze_master()
+
+
+def pre_fork(server, worker):
+    if preload_app:
+        # Соединения мастера не должны достаться воркерам.
+        from django.db import connections
+
+        connections.close_all()
+        # Объекты приложения переходят в постоянное поколение: сборщик
+        # в воркерах их не обходит и не копирует их страницы при записи.
+        gc.freeze()
+
+
+def post_fork(server, worker):
+    gc.enable()
+    worker.rss_limit = rss() + max_memory_growth_mb * 1024 * 1024
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    # Gauge воркера больше не учитываются в сумме по живым процессам.
+    multiprocess.mark_process_dead(worker.pid, metrics_dir)
+
+
+def post_request(worker, req, environ, resp):
+    if max_memory_growth_mb and worker.alive and rss() > worker.rss_limit:
+        worker.log.info(
+            "Worker %s RSS grew over %s MB, restarting",
+            worker.pid,
+            max_memory_growth_mb,
+        )
+        # Воркер завершит текущие запросы и выйдет, мастер запустит новый.
+        worker.alive = False
@@ -13,4 +13,7 @@ echo "Заполняем тестовыми данными..."
 python manage.py seed_data
 
 echo "Запускаем Django сервер.."
+if [ "$SERVER_MODE" = "asgi" ]; then
+    exec gunicorn -c /app/configs/gunicorn.asgi.conf.py core.asgi:application --bind 0.0.0.0:8000
+fi
 exec gunicorn -c /app/configs/gunicorn.conf.py core.wsgi:application --bind 0.0.0.0:8000
\ No newline at end of file
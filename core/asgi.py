@@ -0,0 +1,19 @@
+"""
+ASGI config for core project.
+
+It exposes the ASGI callable as a module-level variable named ``application``.
+Read endpoints of the lessons API run as coroutines in this mode
+(ASYNC_VIEWS), writes keep their sync views.
+
+For more information on this file, see
+https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
+"""
+
+import os
+
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings.local")
+os.environ.setdefault("ASYNC_VIEWS", "1")
+
+application = get_asgi_application()
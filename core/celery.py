@@ -1,6 +1,7 @@
 import os
 
 from celery import Celery
+from celery.signals import task_prerun
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings.local")
 
@@ -20,3 +21,31 @@ app.conf.task_queues = {
 app.conf.task_routes = {
     "*": {"queue": "default"},
 }
+
+# Периодические задачи. Запускаются одним процессом: celery -A core beat
+app.conf.beat_schedule = {
+    "sweep-lesson-lifecycle": {
+        "task": "apps.lessons.tasks.sweep_lesson_lifecycle",
+        "schedule": float(os.getenv("LESSON_LIFECYCLE_INTERVAL", 60)),
+        # Пропущенный запуск не нужен: следующий заберет те же уроки.
+        "options": {"expires": float(os.getenv("LESSON_LIFECYCLE_INTERVAL", 60))},
+    },
+    # Удаление результатов задач старше CELERY_RESULT_EXPIRES. Имя совпадает
+    # со встроенной записью beat и заменяет ее (по умолчанию раз в сутки).
+    "celery.backend_cleanup": {
+        "task": "celery.backend_cleanup",
+        "schedule": float(os.getenv("CELERY_RESULT_CLEANUP_INTERVAL", 60 * 60)),
+        "options": {
+            "expires": float(os.getenv("CELERY_RESULT_CLEANUP_INTERVAL", 60 * 60))
+        },
+    },
+}
+
+
+@task_prerun.connect
+def close_old_db_connections(**kwargs):
+    # Как перед HTTP-запросом: соединение старше CONN_MAX_AGE или с ошибкой
+    # закрывается, остальные проверяются при первом запросе (CONN_HEALTH_CHECKS).
+    from django.db import close_old_connections
+
+    close_old_connections()
@@ -0,0 +1,51 @@
+"""
+Пул соединений PostgreSQL (psycopg_pool) текущего процесса: метрики и проверка БД.
+
+Счетчики пула копятся с запуска процесса, у каждого воркера gunicorn свои.
+"""
+
+import time
+
+from django.db import connections
+
+
+def pool_stats(alias="default"):
+    """Метрики пула или None, если пул для базы не настроен."""
+    connection = connections[alias]
+    if not connection.settings_dict.get("OPTIONS", {}).get("pool"):
+        return None
+
+    stats = connection.pool.get_stats()
+    size = stats.get("pool_size", 0)
+    available = stats.get("pool_available", 0)
+    checkouts = stats.get("requests_num", 0)
+    wait_ms = stats.get("requests_wait_ms", 0)
+    return {
+        "min_size": stats.get("pool_min", 0),
+        "max_size": stats.get("pool_max", 0),
+        "size": size,
+        "in_use": size - available,
+        # Доля занятых соединений от максимума пула.
+        "saturation": round((size - available) / stats["pool_max"], 3),
+        "waiting": stats.get("requests_waiting", 0),
+        "checkouts": checkouts,
+        # Выдачи, которым пришлось ждать свободное соединение.
+        "checkouts_queued": stats.get("requests_queued", 0),
+        "checkout_errors": stats.get("requests_errors", 0),
+        "wait_ms_total": wait_ms,
+        "wait_ms_avg": round(wait_ms / checkouts, 3) if checkouts else 0,
+        "connections_opened": stats.get("connections_num", 0),
+        "connections_errors": stats.get("connections_errors", 0),
+        # Соединения, не прошедшие проверку при выдаче или возврате.
+        "connections_lost": stats.get("connections_lost", 0)
+        + stats.get("returns_bad", 0),
+    }
+
+
+def check_database(alias="default"):
+    """Выполняет SELECT 1, возвращает время ответа в мс."""
+    started = time.perf_counter()
+    with connections[alias].cursor() as cursor:
+        cursor.execute("SELECT 1")
+        cursor.fetchone()
+    return round((time.perf_counter() - started) * 1000, 3)
@@ -0,0 +1,390 @@
+"""
+Метрики производительности в формате Prometheus (GET /metrics).
+
+MetricsMiddleware (core/middleware.py) открывает на время запроса
+RequestMetrics в contextvar, хуки ниже добавляют в него:
+
+- SQL - обертка execute_wrapper, ставится на каждое соединение с БД;
+- Redis - клиент InstrumentedRedis для django-redis (REDIS_CLIENT_CLASS),
+  пайплайн считается одним обращением;
+- публикация задач Celery - сигналы before/after_task_publish.
+
+После ответа значения попадают в метрики с метками view (класс или имя
+маршрута) и action (действие ViewSet). Вне запроса хуки ничего не пишут,
+кроме общей гистограммы публикации задач.
+
+Под gunicorn воркеры пишут метрики в общий каталог PROMETHEUS_MULTIPROC_DIR
+(см. configs/gunicorn.conf.py), и /metrics отдает сумму по всем воркерам.
+Счетчики кеша уроков, пула соединений и состояние реплик процесса
+переносятся в метрики не чаще раза в PROCESS_SYNC_INTERVAL секунд.
+"""
+
+import logging
+import os
+import threading
+import time
+from contextvars import ContextVar
+
+from celery.signals import after_task_publish, before_task_publish
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from redis.client import Pipeline, Redis
+
+from apps.lessons.cache import stats as cache_stats
+
+from .db import pool_stats
+from .replicas import replica_status
+
+logger = logging.getLogger("slow_requests")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+CALLS_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+PROCESS_SYNC_INTERVAL = 5
+# Сколько SQL одного запроса хранится для лога медленных запросов.
+SLOW_REQUEST_MAX_QUERIES = 100
+
+REQUEST_LABELS = ("view", "action")
+
+request_duration = Histogram(
+    "http_request_duration_seconds",
+    "Время обработки запроса",
+    REQUEST_LABELS,
+    buckets=LATENCY_BUCKETS,
+)
+responses = Counter(
+    "http_responses",
+    "Ответы по коду статуса",
+    (*REQUEST_LABELS, "status"),
+)
+db_queries = Histogram(
+    "http_request_db_queries",
+    "Число SQL-запросов на запрос",
+    REQUEST_LABELS,
+    buckets=CALLS_BUCKETS,
+)
+db_seconds = Counter(
+    "http_request_db_seconds",
+    "Время SQL-запросов",
+    REQUEST_LABELS,
+)
+redis_commands = Histogram(
+    "http_request_redis_commands",
+    "Число обращений к Redis на запрос",
+    REQUEST_LABELS,
+    buckets=CALLS_BUCKETS,
+)
+redis_seconds = Counter(
+    "http_request_redis_seconds",
+    "Время обращений к Redis",
+    REQUEST_LABELS,
+)
+celery_publishes = Counter(
+    "http_request_celery_publishes",
+    "Задачи Celery, поставленные в очередь при обработке запроса",
+    REQUEST_LABELS,
+)
+celery_publish_seconds = Counter(
+    "http_request_celery_publish_seconds",
+    "Время постановки задач Celery в очередь при обработке запроса",
+    REQUEST_LABELS,
+)
+task_publish_duration = Histogram(
+    "celery_task_publish_duration_seconds",
+    "Время постановки задачи Celery в очередь",
+    ("task",),
+    buckets=LATENCY_BUCKETS,
+)
+lesson_cache_events = Counter(
+    "lesson_detail_cache_events",
+    "События кеша уроков (apps.lessons.cache.stats)",
+    ("event",),
+)
+db_pool_events = Counter(
+    "db_pool_events",
+    "События пула соединений (core.db.pool_stats)",
+    ("alias", "event"),
+)
+db_pool_wait_seconds = Counter(
+    "db_pool_wait_seconds",
+    "Ожидание соединения из пула",
+    ("alias",),
+)
+db_pool_connections = Gauge(
+    "db_pool_connections",
+    "Соединения пула: open, in_use, max",
+    ("alias", "state"),
+    multiprocess_mode="livesum",
+)
+db_pool_waiting = Gauge(
+    "db_pool_waiting",
+    "Запросы, ожидающие соединение из пула",
+    ("alias",),
+    multiprocess_mode="livesum",
+)
+
+db_replica_lag = Gauge(
+    "db_replica_lag_seconds",
+    "Отставание реплики по последней проверке (core/replicas.py)",
+    ("alias",),
+    multiprocess_mode="livemax",
+)
+db_replica_healthy = Gauge(
+    "db_replica_healthy",
+    "Реплика используется для чтения: 1 или 0",
+    ("alias",),
+    multiprocess_mode="livemin",
+)
+
+DB_POOL_EVENTS = (
+    "checkouts",
+    "checkouts_queued",
+    "checkout_errors",
+    "connections_opened",
+    "connections_errors",
+    "connections_lost",
+)
+
+
+class RequestMetrics:
+    __slots__ = (
+        "db_queries",
+        "db_seconds",
+        "redis_commands",
+        "redis_seconds",
+        "celery_publishes",
+        "celery_publish_seconds",
+        "queries",
+    )
+
+    def __init__(self, record_queries=False):
+        self.db_queries = 0
+        self.db_seconds = 0.0
+        self.redis_commands = 0
+        self.redis_seconds = 0.0
+        self.celery_publishes = 0
+        self.celery_publish_seconds = 0.0
+        # (sql, мс) для лога медленных запросов или None.
+        self.queries = [] if record_queries else None
+
+
+current = ContextVar("request_metrics", default=None)
+
+
+def record_sql(execute, sql, params, many, context):
+    metrics = current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - started
+        metrics.db_queries += 1
+        metrics.db_seconds += elapsed
+        queries = metrics.queries
+        if queries is not None and len(queries) < SLOW_REQUEST_MAX_QUERIES:
+            queries.append((sql, elapsed * 1000))
+
+
+@receiver(connection_created)
+def install_sql_hook(sender, connection, **kwargs):
+    # Сигнал приходит при каждом подключении, обертка ставится один раз.
+    if settings.METRICS_ENABLED and record_sql not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_sql)
+
+
+# Соединения, открытые в этом потоке до импорта модуля.
+for _connection in connections.all(initialized_only=True):
+    install_sql_hook(None, _connection)
+
+
+class InstrumentedPipeline(Pipeline):
+    def execute(self, *args, **kwargs):
+        metrics = current.get()
+        if metrics is None:
+            return super().execute(*args, **kwargs)
+
+        started = time.perf_counter()
+        try:
+            return super().execute(*args, **kwargs)
+        finally:
+            metrics.redis_commands += 1
+            metrics.redis_seconds += time.perf_counter() - started
+
+
+class InstrumentedRedis(Redis):
+    """Клиент Redis, считающий обращения текущего запроса."""
+
+    def execute_command(self, *args, **options):
+        metrics = current.get()
+        if metrics is None:
+            return super().execute_command(*args, **options)
+
+        started = time.perf_counter()
+        try:
+            return super().execute_command(*args, **options)
+        finally:
+            metrics.redis_commands += 1
+            metrics.redis_seconds += time.perf_counter() - started
+
+    def pipeline(self, transaction=True, shard_hint=None):
+        return InstrumentedPipeline(
+            self.connection_pool, self.response_callbacks, transaction, shard_hint
+        )
+
+
+# (id задачи, время начала) публикации в текущем потоке или задаче asyncio.
+# Сигналы приходят в том же вызове apply_async; если публикация упала и
+# after_task_publish не пришел, значение перезапишет следующая публикация.
+_publish_started = ContextVar("publish_started", default=None)
+
+
+@before_task_publish.connect
+def publish_started(headers=None, **kwargs):
+    _publish_started.set((headers["id"], time.perf_counter()))
+
+
+@after_task_publish.connect
+def publish_finished(sender=None, headers=None, **kwargs):
+    publish = _publish_started.get()
+    if publish is None or publish[0] != headers["id"]:
+        return
+    _publish_started.set(None)
+    started = publish[1]
+    elapsed = time.perf_counter() - started
+    task_publish_duration.labels(sender).observe(elapsed)
+    metrics = current.get()
+    if metrics is not None:
+        metrics.celery_publishes += 1
+        metrics.celery_publish_seconds += elapsed
+
+
+def view_labels(request):
+    """(view, action): класс представления или имя маршрута, действие ViewSet."""
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return "unmatched", ""
+    view = getattr(match.func, "cls", None)
+    actions = getattr(match.func, "actions", None) or {}
+    action = actions.get(request.method.lower(), "")
+    return (view.__name__ if view else match.view_name), action
+
+
+def observe_request(request, response, metrics, duration):
+    labels = view_labels(request)
+    request_duration.labels(*labels).observe(duration)
+    responses.labels(*labels, response.status_code).inc()
+    db_queries.labels(*labels).observe(metrics.db_queries)
+    redis_commands.labels(*labels).observe(metrics.redis_commands)
+    if metrics.db_seconds:
+        db_seconds.labels(*labels).inc(metrics.db_seconds)
+    if metrics.redis_seconds:
+        redis_seconds.labels(*labels).inc(metrics.redis_seconds)
+    if metrics.celery_publishes:
+        celery_publishes.labels(*labels).inc(metrics.celery_publishes)
+        celery_publish_seconds.labels(*labels).inc(metrics.celery_publish_seconds)
+
+    threshold = settings.METRICS_SLOW_REQUEST_MS
+    if threshold and duration * 1000 >= threshold:
+        log_slow_request(request, response, metrics, duration, labels)
+    sync_process_metrics()
+
+
+def log_slow_request(request, response, metrics, duration, labels):
+    lines = [
+        f"{request.method} {request.get_full_path()} {response.status_code} "
+        f"{duration * 1000:.1f} ms view={labels[0]} action={labels[1]} "
+        f"sql={metrics.db_queries} ({metrics.db_seconds * 1000:.1f} ms) "
+        f"redis={metrics.redis_commands} ({metrics.redis_seconds * 1000:.1f} ms) "
+        f"celery={metrics.celery_publishes} ({metrics.celery_publish_seconds * 1000:.1f} ms)"
+    ]
+    lines += [
+        f"  {ms:8.2f} ms  {' '.join(sql.split())}" for sql, ms in metrics.queries or ()
+    ]
+    if metrics.db_queries > len(metrics.queries or ()):
+        lines.append(f"  ... еще {metrics.db_queries - len(metrics.queries)} SQL")
+    logger.warning("\n".join(lines))
+
+
+_sync_lock = threading.Lock()
+_synced_at = 0.0
+# Последние перенесенные значения накопительных счетчиков процесса.
+_synced = {}
+
+
+def _sync_counter(counter, key, value, *labels):
+    delta = value - _synced.get(key, 0)
+    if delta > 0:
+        counter.labels(*labels).inc(delta)
+    _synced[key] = value
+
+
+def sync_process_metrics(force=False):
+    """Переносит счетчики кеша уроков и пула соединений процесса в метрики."""
+    global _synced_at
+    now = time.monotonic()
+    if not force and now - _synced_at < PROCESS_SYNC_INTERVAL:
+        return
+    if not _sync_lock.acquire(blocking=False):
+        return
+    try:
+        _synced_at = now
+        for event, value in list(cache_stats.items()):
+            _sync_counter(lesson_cache_events, ("cache", event), value, event)
+
+        # Только базы, с которыми этот поток уже работал: обращение к пулу
+        # незнакомой базы (например, неиспользуемой реплики) создало бы его.
+        # Синхронизация идет после каждого запроса, поэтому пулы всех баз,
+        # которые читает процесс, попадают в метрики.
+        for connection in connections.all(initialized_only=True):
+            alias = connection.alias
+            stats = pool_stats(alias)
+            if stats is None:
+                continue
+            for event in DB_POOL_EVENTS:
+                _sync_counter(
+                    db_pool_events, (alias, event), stats[event], alias, event
+                )
+            _sync_counter(
+                db_pool_wait_seconds,
+                (alias, "wait_seconds"),
+                stats["wait_ms_total"] / 1000,
+                alias,
+            )
+            db_pool_connections.labels(alias, "open").set(stats["size"])
+            db_pool_connections.labels(alias, "in_use").set(stats["in_use"])
+            db_pool_connections.labels(alias, "max").set(stats["max_size"])
+            db_pool_waiting.labels(alias).set(stats["waiting"])
+
+        for alias, status in replica_status(check=False).items():
+            if status is None:
+                continue
+            db_replica_healthy.labels(alias).set(int(status.healthy))
+            if status.lag is not None:
+                db_replica_lag.labels(alias).set(status.lag)
+    finally:
+        _sync_lock.release()
+
+
+def render():
+    """Метрики в текстовом формате Prometheus: (тело, content type)."""
+    sync_process_metrics(force=True)
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -0,0 +1,143 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from . import metrics, replicas
+
+
+class MetricsMiddleware:
+    """
+    Время запроса, SQL, Redis и публикация задач Celery по представлениям
+    (core/metrics.py). Работает и под WSGI, и под ASGI без переключения в поток.
+
+    Потоковый ответ (выгрузка) читает строки уже после возврата из
+    представления, поэтому его метрики записываются при закрытии потока:
+    время - до последнего фрагмента, SQL - включая чтение строк.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.record_queries = bool(settings.METRICS_SLOW_REQUEST_MS)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        request_metrics = metrics.RequestMetrics(self.record_queries)
+        token = metrics.current.set(request_metrics)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            metrics.current.reset(token)
+        return self.observe(request, response, request_metrics, started)
+
+    async def __acall__(self, request):
+        request_metrics = metrics.RequestMetrics(self.record_queries)
+        token = metrics.current.set(request_metrics)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            metrics.current.reset(token)
+        return self.observe(request, response, request_metrics, started)
+
+    def observe(self, request, response, request_metrics, started):
+        def finish():
+            duration = time.perf_counter() - started
+            metrics.observe_request(request, response, request_metrics, duration)
+
+        if not response.streaming:
+            finish()
+        elif response.is_async:
+            response.streaming_content = self.astream(
+                response.streaming_content, request_metrics, finish
+            )
+        else:
+            response.streaming_content = self.stream(
+                response.streaming_content, request_metrics, finish
+            )
+        return response
+
+    @staticmethod
+    def stream(content, request_metrics, finish):
+        # Метрики запроса действуют, только пока готовится очередной фрагмент.
+        try:
+            while True:
+                token = metrics.current.set(request_metrics)
+                try:
+                    chunk = next(content)
+                except StopIteration:
+                    return
+                finally:
+                    metrics.current.reset(token)
+                yield chunk
+        finally:
+            finish()
+
+    @staticmethod
+    async def astream(content, request_metrics, finish):
+        try:
+            while True:
+                token = metrics.current.set(request_metrics)
+                try:
+                    chunk = await anext(content)
+                except StopAsyncIteration:
+                    return
+                finally:
+                    metrics.current.reset(token)
+                yield chunk
+        finally:
+            finish()
+
+
+class ReplicaMiddleware:
+    """
+    Состояние чтения с реплик на время запроса (core/replicas.py). Если
+    запрос писал в БД, клиент на время читает только из default.
+    Без DB_REPLICAS не подключается.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not replicas.replica_aliases():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        state = replicas.ReadState()
+        token = replicas.current.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            replicas.current.reset(token)
+        if state.wrote:
+            replicas.stick_to_primary(request, response)
+        return response
+
+    async def __acall__(self, request):
+        state = replicas.ReadState()
+        token = replicas.current.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            replicas.current.reset(token)
+        if state.wrote:
+            await sync_to_async(replicas.stick_to_primary)(request, response)
+        return response
@@ -0,0 +1,135 @@
+"""
+OpenAPI-схема API для /swagger/ и /redoc/.
+
+Схема не зависит от пользователя (public=True), поэтому генерируется один
+раз: командой generate_openapi_schema при сборке образа в OPENAPI_SCHEMA_DIR
+или, если файлов нет, при первом запросе процесса. Дальше схема отдается
+готовыми байтами из памяти с ETag и Cache-Control, повторный запрос с
+If-None-Match получает 304. Страницы UI по-прежнему рендерит drf_yasg:
+они сами схему не строят и загружают ее отдельным запросом (?format=openapi).
+"""
+
+import hashlib
+import os
+import threading
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from drf_yasg import generators, openapi
+from drf_yasg.views import get_schema_view
+from rest_framework import permissions
+from rest_framework.authentication import BasicAuthentication, SessionAuthentication
+
+INFO = openapi.Info(
+    title="Lesson API",
+    default_version="v1",
+    description="API для управления уроками",
+)
+
+
+class BothHttpAndHttpsSchemaGenerator(generators.OpenAPISchemaGenerator):
+    def get_schema(self, request=None, public=False):
+        schema = super().get_schema(request, public)
+        schema.schemes = settings.SWAGGER_SCHEMAS
+        return schema
+
+
+schema_view = get_schema_view(
+    INFO,
+    public=True,
+    generator_class=BothHttpAndHttpsSchemaGenerator,
+    permission_classes=(permissions.AllowAny,),
+    authentication_classes=(SessionAuthentication, BasicAuthentication),
+)
+
+# Формат рендерера -> файл схемы; openapi и json отличаются только content type.
+SPEC_FILES = {"openapi": "openapi.json", "json": "openapi.json", "yaml": "openapi.yaml"}
+
+# Формат рендерера -> Spec, заполняется load_specs().
+_specs = {}
+_lock = threading.Lock()
+
+
+class Spec:
+    """Готовый ответ со схемой в одном формате."""
+
+    def __init__(self, content, content_type):
+        self.content = content
+        self.content_type = content_type
+        digest = hashlib.sha256(content_type.encode() + b"\n" + content)
+        self.etag = f'"{digest.hexdigest()[:32]}"'
+
+
+def generate_specs():
+    """Схема во всех форматах: {имя файла: байты}."""
+    generator = BothHttpAndHttpsSchemaGenerator(INFO)
+    schema = generator.get_schema(request=None, public=True)
+    renderers = {renderer.format: renderer for renderer in schema_view.renderer_classes}
+    return {
+        filename: renderers[spec_format]().render(schema)
+        for spec_format, filename in SPEC_FILES.items()
+    }
+
+
+def write_specs(directory=None):
+    directory = directory or settings.OPENAPI_SCHEMA_DIR
+    os.makedirs(directory, exist_ok=True)
+    specs = generate_specs()
+    for filename, content in specs.items():
+        with open(os.path.join(directory, filename), "wb") as f:
+            f.write(content)
+    return specs
+
+
+def read_specs(directory=None):
+    """Схема из файлов generate_openapi_schema, None если их нет."""
+    directory = directory or settings.OPENAPI_SCHEMA_DIR
+    specs = {}
+    try:
+        for filename in set(SPEC_FILES.values()):
+            with open(os.path.join(directory, filename), "rb") as f:
+                specs[filename] = f.read()
+    except FileNotFoundError:
+        return None
+    return specs
+
+
+def load_specs():
+    """
+    Загружает схему в память процесса: из OPENAPI_SCHEMA_DIR или, если файлов
+    нет, генерирует. Под gunicorn с preload вызывается в мастере до fork.
+    """
+    with _lock:
+        if _specs:
+            return
+        contents = read_specs() or generate_specs()
+        for renderer in schema_view.renderer_classes:
+            filename = SPEC_FILES.get(renderer.format)
+            if filename:
+                content_type = f"{renderer.media_type}; charset=utf-8"
+                _specs[renderer.format] = Spec(contents[filename], content_type)
+
+
+def get_spec(spec_format):
+    if not _specs:
+        load_specs()
+    return _specs[spec_format]
+
+
+class SchemaView(schema_view):
+    def get(self, request, version="", format=None):
+        spec_format = request.accepted_renderer.format
+        if spec_format not in SPEC_FILES:
+            # Страница UI: drf_yasg строит для нее пустую схему без эндпоинтов.
+            return super().get(request, version, format)
+
+        spec = get_spec(spec_format)
+        response = get_conditional_response(request, etag=spec.etag)
+        if response is None:
+            response = HttpResponse(spec.content, content_type=spec.content_type)
+        response["ETag"] = spec.etag
+        patch_cache_control(
+            response, public=True, max_age=settings.OPENAPI_SCHEMA_MAX_AGE
+        )
+        return response
@@ -0,0 +1,219 @@
+"""
+Чтение с реплик PostgreSQL (DB_REPLICAS) с read-your-writes.
+
+- ReplicaRouter: запись и чтение по умолчанию идут в default. На реплику
+  уходят только чтения запроса, который явно это разрешил: действия
+  replica_actions ViewSet (apps/lessons/viewsets.py, use_replica) или
+  код внутри replica_reads() вне запроса (отчеты, команды).
+- Read-your-writes: ReplicaMiddleware открывает на время запроса
+  ReadState. Ответ на запрос, который хоть раз обратился к БД на запись,
+  ставит клиенту подписанную cookie, а аутентифицированного пользователя
+  еще и отмечает в кеше (клиенты API не всегда хранят cookie). Следующие
+  DB_REPLICA_STICKY_SECONDS с чтения такого клиента идут в default: он не
+  увидит на реплике устаревший статус урока, даже анонимный.
+- Здоровье реплик: фоновые потоки каждого процесса раз в
+  DB_REPLICA_CHECK_INTERVAL с измеряют отставание реплик. Недоступная или
+  отстающая больше DB_REPLICA_MAX_LAG с реплика пропускается, пока не
+  проверена - тоже. Без здоровых реплик чтения идут в default.
+
+Без DB_REPLICAS все запросы идут в default, а middleware отключается.
+"""
+
+import logging
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import NamedTuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+
+logger = logging.getLogger("replicas")
+
+STICKY_KEY = "db:primary:{}"
+STICKY_COOKIE = "db_primary"
+STICKY_SALT = "core.replicas"
+
+# Отставание реплики, с: 0, если применен весь полученный WAL или база не
+# standby (локальная реплика-заменитель).
+LAG_SQL = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(
+            EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0
+        )
+    END
+"""
+
+
+def replica_aliases():
+    return [alias for alias in settings.DATABASES if alias.startswith("replica_")]
+
+
+class ReadState:
+    __slots__ = ("replica", "wrote")
+
+    def __init__(self, replica=False):
+        # Чтения запроса можно отправлять на реплику.
+        self.replica = replica
+        # Запрос обращался к БД на запись.
+        self.wrote = False
+
+
+current = ContextVar("read_state", default=None)
+
+
+@contextmanager
+def replica_reads():
+    """Чтения внутри блока идут на здоровую реплику (вне HTTP-запроса)."""
+    token = current.set(ReadState(replica=True))
+    try:
+        yield
+    finally:
+        current.reset(token)
+
+
+def use_replica(request):
+    """Разрешает текущему запросу читать с реплики, если клиент недавно не писал."""
+    state = current.get()
+    if state is None or wrote_recently(request):
+        return
+    state.replica = True
+
+
+def wrote_recently(request):
+    # Срок cookie проверяется по подписи, а не только по max_age у клиента.
+    if request.get_signed_cookie(
+        STICKY_COOKIE,
+        default=None,
+        salt=STICKY_SALT,
+        max_age=settings.DB_REPLICA_STICKY_SECONDS,
+    ):
+        return True
+    user = getattr(request, "user", None)
+    return bool(
+        user is not None
+        and user.is_authenticated
+        and cache.get(STICKY_KEY.format(user.pk))
+    )
+
+
+def stick_to_primary(request, response):
+    """Отправляет чтения клиента в default на DB_REPLICA_STICKY_SECONDS с."""
+    response.set_signed_cookie(
+        STICKY_COOKIE,
+        "1",
+        salt=STICKY_SALT,
+        max_age=settings.DB_REPLICA_STICKY_SECONDS,
+        secure=settings.SESSION_COOKIE_SECURE,
+        httponly=True,
+        samesite="Lax",
+    )
+    user = getattr(request, "user", None)
+    if user is not None and user.is_authenticated:
+        cache.set(STICKY_KEY.format(user.pk), 1, settings.DB_REPLICA_STICKY_SECONDS)
+
+
+class ReplicaStatus(NamedTuple):
+    healthy: bool
+    # Отставание, с; None, если реплика недоступна.
+    lag: float | None
+    error: str | None
+    checked_at: float
+
+
+# Алиас -> ReplicaStatus последней проверки в этом процессе.
+_status = {}
+_checker_lock = threading.Lock()
+_checker_pid = None
+
+
+def check_replica(alias):
+    try:
+        with connections[alias].cursor() as cursor:
+            cursor.execute(LAG_SQL)
+            lag = float(cursor.fetchone()[0])
+    except Exception as exc:
+        # Любая ошибка проверки: реплика пропускается, поток продолжает работу.
+        return ReplicaStatus(False, None, str(exc), time.time())
+    finally:
+        # Соединение возвращается в пул между проверками.
+        connections[alias].close()
+    return ReplicaStatus(lag <= settings.DB_REPLICA_MAX_LAG, lag, None, time.time())
+
+
+def _check_loop(alias):
+    while True:
+        status = check_replica(alias)
+        previous = _status.get(alias)
+        # Логируется смена состояния, в том числе неудачная первая проверка.
+        if (previous is None or previous.healthy) != status.healthy:
+            if status.healthy:
+                logger.warning("Replica %s is back, lag %.1f s", alias, status.lag)
+            elif status.error:
+                logger.warning("Replica %s is unavailable: %s", alias, status.error)
+            else:
+                logger.warning("Replica %s lags %.1f s, skipped", alias, status.lag)
+        _status[alias] = status
+        time.sleep(settings.DB_REPLICA_CHECK_INTERVAL)
+
+
+def start_checker():
+    """
+    Запускает потоки проверки в текущем процессе (после fork - заново), по
+    одному на реплику: недоступная реплика ждет таймаут пула, не задерживая
+    проверку остальных.
+    """
+    global _checker_pid
+    if _checker_pid == os.getpid() or not replica_aliases():
+        return
+    with _checker_lock:
+        if _checker_pid == os.getpid():
+            return
+        # Статус, унаследованный от мастера gunicorn, не проверялся этим процессом.
+        _status.clear()
+        for alias in replica_aliases():
+            threading.Thread(
+                target=_check_loop, args=(alias,), name=f"check-{alias}", daemon=True
+            ).start()
+        _checker_pid = os.getpid()
+
+
+def replica_status(check=True):
+    """
+    Состояние реплик для /health/db/ и метрик: {алиас: ReplicaStatus}.
+    check=False не запускает проверку (и соединения с репликами), если
+    процесс еще не читал с реплик.
+    """
+    if check:
+        start_checker()
+    return {alias: _status.get(alias) for alias in replica_aliases()}
+
+
+def choose_replica():
+    start_checker()
+    healthy = [alias for alias, status in list(_status.items()) if status.healthy]
+    return random.choice(healthy) if healthy else None
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = current.get()
+        if state is None or not state.replica or state.wrote:
+            return None
+        return choose_replica()
+
+    def db_for_write(self, model, **hints):
+        state = current.get()
+        if state is not None:
+            state.wrote = True
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики содержат те же данные, что и default.
+        return True
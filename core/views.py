@@ -0,0 +1,88 @@
+import functools
+import hmac
+import ipaddress
+import logging
+
+from django.conf import settings
+from django.db import DatabaseError
+from django.http import HttpResponse, HttpResponseForbidden, JsonResponse
+
+from . import metrics as request_metrics
+from .db import check_database, pool_stats
+from .replicas import replica_status
+
+logger = logging.getLogger("health")
+
+
+def monitoring_only(view):
+    """
+    Доступ только с адресов MONITORING_ALLOWED_IPS или с токеном
+    MONITORING_TOKEN в заголовке Authorization: Bearer <токен>.
+    """
+
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not monitoring_allowed(request):
+            return HttpResponseForbidden()
+        return view(request, *args, **kwargs)
+
+    return wrapper
+
+
+def monitoring_allowed(request):
+    token = settings.MONITORING_TOKEN
+    if token:
+        scheme, _, value = request.headers.get("Authorization", "").partition(" ")
+        if scheme.lower() == "bearer" and hmac.compare_digest(value, token):
+            return True
+    try:
+        address = ipaddress.ip_address(request.META.get("REMOTE_ADDR", ""))
+    except ValueError:
+        return False
+    return any(
+        address in ipaddress.ip_network(network, strict=False)
+        for network in settings.MONITORING_ALLOWED_IPS
+    )
+
+
+def replica_health(status):
+    """Состояние реплики без текста ошибки: в нем бывают адреса и параметры DSN."""
+    if status is None:
+        return {"status": "unchecked"}
+    if status.healthy:
+        state = "ok"
+    elif status.error:
+        state = "unavailable"
+    else:
+        state = "lagging"
+    return {"status": state, "lag": status.lag, "checked_at": status.checked_at}
+
+
+@monitoring_only
+def database_health(request):
+    """GET /health/db/ - доступность БД, метрики пула и состояние реплик процесса"""
+    try:
+        latency_ms = check_database()
+    except DatabaseError:
+        logger.exception("Database health check failed")
+        return JsonResponse({"status": "error"}, status=503)
+    # Недоступная реплика не делает сервис нездоровым: чтения идут в default.
+    replicas = {
+        alias: {**replica_health(status), "pool": pool_stats(alias)}
+        for alias, status in replica_status().items()
+    }
+    return JsonResponse(
+        {
+            "status": "ok",
+            "latency_ms": latency_ms,
+            "pool": pool_stats(),
+            "replicas": replicas,
+        }
+    )
+
+
+@monitoring_only
+def metrics(request):
+    """GET /metrics - метрики в формате Prometheus (core/metrics.py)"""
+    payload, content_type = request_metrics.render()
+    return HttpResponse(payload, content_type=content_type)